@@ -90,12 +90,13 @@ class SentenceTransformerEmbedding:
         )
         return embedding
 
-    def embed_batch(self, texts: list[str]) -> np.ndarray:
+    def embed_batch(self, texts: list[str], batch_size: int = 32) -> np.ndarray:
         """
         Generate embeddings for multiple texts.
 
         Args:
             texts: List of input texts
+            batch_size: Texts per model forward pass
 
         Returns:
             numpy array of shape (len(texts), dimension)
@@ -107,6 +108,7 @@ class SentenceTransformerEmbedding:
             texts,
             convert_to_numpy=True,
             normalize_embeddings=True,
+            batch_size=batch_size,
             show_progress_bar=len(texts) > 10,
         )
         return embeddings
@@ -0,0 +1,27 @@
+-- Switch person recognition vector indexes from cosine to inner product.
+-- Embeddings and centroids are stored unit-length, so inner product equals
+-- cosine similarity and skips the per-row norm computation.
+
+-- Normalize any embeddings stored before client-side normalization
+UPDATE face_embeddings SET embedding = l2_normalize(embedding);
+UPDATE gait_embeddings SET embedding = l2_normalize(embedding);
+
+DROP INDEX IF EXISTS idx_face_embedding;
+CREATE INDEX IF NOT EXISTS idx_face_embedding_ip ON face_embeddings
+USING ivfflat (embedding vector_ip_ops)
+WITH (lists = 100);
+
+DROP INDEX IF EXISTS idx_gait_embedding;
+CREATE INDEX IF NOT EXISTS idx_gait_embedding_ip ON gait_embeddings
+USING ivfflat (embedding vector_ip_ops)
+WITH (lists = 100);
+
+DROP INDEX IF EXISTS idx_persons_face_centroid;
+CREATE INDEX IF NOT EXISTS idx_persons_face_centroid_ip ON persons
+USING ivfflat (face_centroid vector_ip_ops)
+WITH (lists = 100);
+
+DROP INDEX IF EXISTS idx_persons_gait_centroid;
+CREATE INDEX IF NOT EXISTS idx_persons_gait_centroid_ip ON persons
+USING ivfflat (gait_centroid vector_ip_ops)
+WITH (lists = 100);
@@ -245,6 +245,50 @@ class ConversationRepository:
             for row in reversed(rows)
         ]
 
+    async def get_session_ids(
+        self,
+        turn_type: Optional[str] = None,
+        min_turns: int = 1,
+    ) -> list[UUID]:
+        """
+        Get IDs of sessions that have at least min_turns turns.
+
+        Args:
+            turn_type: Only count turns of this type, None for all
+            min_turns: Minimum number of (matching) turns in the session
+
+        Returns:
+            Session IDs, oldest conversation first
+        """
+        pool = get_db_pool()
+
+        if turn_type:
+            rows = await pool.fetch(
+                """
+                SELECT session_id
+                FROM conversation_turns
+                WHERE turn_type = $1
+                GROUP BY session_id
+                HAVING COUNT(*) >= $2
+                ORDER BY MIN(created_at)
+                """,
+                turn_type,
+                min_turns,
+            )
+        else:
+            rows = await pool.fetch(
+                """
+                SELECT session_id
+                FROM conversation_turns
+                GROUP BY session_id
+                HAVING COUNT(*) >= $1
+                ORDER BY MIN(created_at)
+                """,
+                min_turns,
+            )
+
+        return [row["session_id"] for row in rows]
+
     async def delete_session_history(self, session_id: UUID) -> int:
         """
         Delete all turns for a session.
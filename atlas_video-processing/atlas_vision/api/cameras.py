@@ -429,6 +429,7 @@ async def stream_full_recognition(
     """
     import cv2
     import asyncio
+    import time
     from typing import AsyncGenerator
     from fastapi.responses import StreamingResponse
 
@@ -439,6 +440,7 @@ async def stream_full_recognition(
         get_gait_service,
         get_person_repository,
         get_track_manager,
+        pose_to_array,
     )
 
     camera = device_registry.get(camera_id)
@@ -468,6 +470,8 @@ async def stream_full_recognition(
                     continue
 
                 frame_h, frame_w = frame.shape[:2]
+                # One wall-clock timestamp shared by all track updates this frame
+                now = time.time()
 
                 # Run YOLO tracking for person detection
                 tracks = await yolo.track(frame, camera_id)
@@ -482,7 +486,7 @@ async def stream_full_recognition(
                         int(track.bbox.y2 * frame_h),
                     ]
                     track_manager.create_or_update_track(
-                        camera_id, track.track_id, bbox
+                        camera_id, track.track_id, bbox, now=now
                     )
 
                 # Detect all faces in frame
@@ -525,6 +529,7 @@ async def stream_full_recognition(
                                         result["name"],
                                         result.get("is_known", False),
                                         result["similarity"],
+                                        now=now,
                                     )
                                     if enroll_gait and result.get("is_known"):
                                         counts = await repo.get_person_embedding_counts(
@@ -547,7 +552,7 @@ async def stream_full_recognition(
                         )
                         if pose_track:
                             gait_service.add_pose_to_track(
-                                camera_id, pose_track.track_id, pose
+                                camera_id, pose_track.track_id, pose_to_array(pose)
                             )
                             if gait_service.is_track_buffer_full(camera_id, pose_track.track_id):
                                 pt_track = track_manager.get_track(camera_id, pose_track.track_id)
@@ -579,12 +584,15 @@ async def stream_full_recognition(
                                                 camera_id,
                                                 pose_track.track_id,
                                                 gait_result["similarity"],
+                                                now=now,
                                             )
                                     except Exception as e:
                                         logger.warning("Gait rec error: %s", e)
 
                 # Cleanup stale tracks
-                track_manager.cleanup_stale_tracks(max_age=cfg.track_timeout)
+                track_manager.cleanup_stale_tracks(
+                    max_age=cfg.track_timeout, now=now
+                )
 
                 # Draw overlays
                 for track in person_tracks:
@@ -89,7 +89,11 @@ class RecognitionConfig(BaseSettings):
     mediapipe_detection_confidence: float = Field(default=0.5, description="Pose detect")
     mediapipe_tracking_confidence: float = Field(default=0.5, description="Pose track")
     track_timeout: float = Field(default=10.0, description="Track timeout seconds")
+    iou_threshold: float = Field(default=0.3, description="Min IoU for pose-track match")
     max_tracked_persons: int = Field(default=10, description="Max tracked persons")
+    detection_input_width: int = Field(
+        default=640, description="Pose detection input width (0 = full res)"
+    )
 
 
 class PresenceConfig(BaseSettings):
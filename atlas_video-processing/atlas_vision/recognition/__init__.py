@@ -5,7 +5,7 @@ Provides face and gait recognition with person tracking.
 """
 
 from .face import FaceRecognitionService, get_face_service
-from .gait import GaitRecognitionService, get_gait_service
+from .gait import GaitRecognitionService, get_gait_service, pose_to_array
 from .repository import PersonRepository, get_person_repository
 from .tracker import TrackManager, TrackedPerson, get_track_manager
 
@@ -14,6 +14,7 @@ __all__ = [
     "get_face_service",
     "GaitRecognitionService",
     "get_gait_service",
+    "pose_to_array",
     "PersonRepository",
     "get_person_repository",
     "TrackManager",
@@ -4,16 +4,35 @@ Gait recognition service using MediaPipe Pose.
 Supports multi-person concurrent tracking with per-track pose buffers.
 """
 
+import functools
 import logging
+import math
+import os
+import threading
 import time
-from collections import deque
-from typing import Optional
+import urllib.request
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Optional, Union
 from uuid import UUID
 
 import numpy as np
 
+try:
+    import cv2
+    import mediapipe as mp
+
+    _HAVE_MP = True
+except ImportError:
+    _HAVE_MP = False
+
 logger = logging.getLogger("atlas.vision.recognition.gait")
 
+POSE_MODEL_PATH = Path("models/pose_landmarker_lite.task")
+POSE_MODEL_URL = "https://storage.googleapis.com/mediapipe-models/pose_landmarker/pose_landmarker_lite/float16/1/pose_landmarker_lite.task"
+
+_model_lock = threading.Lock()
+
 # MediaPipe pose landmark indices
 POSE_LANDMARKS = {
     "nose": 0,
@@ -31,6 +50,61 @@ POSE_LANDMARKS = {
     "right_ankle": 28,
 }
 
+# Embedding layout: 8 temporal statistics of 12 per-frame features,
+# zero-padded to EMBEDDING_DIM
+FEATURES_PER_FRAME = 12
+EMBEDDING_DIM = 256
+
+# Row positions within POSE_LANDMARKS order, for dense (13, 2) pose arrays
+_LANDMARK_ROWS = {name: i for i, name in enumerate(POSE_LANDMARKS)}
+_LS = _LANDMARK_ROWS["left_shoulder"]
+_RS = _LANDMARK_ROWS["right_shoulder"]
+_LH = _LANDMARK_ROWS["left_hip"]
+_RH = _LANDMARK_ROWS["right_hip"]
+_LA = _LANDMARK_ROWS["left_ankle"]
+_RA = _LANDMARK_ROWS["right_ankle"]
+
+# Joint angle triplets (p1, vertex, p3), same order as _extract_frame_features
+_ANGLE_INDICES = np.array([
+    [_LANDMARK_ROWS[a], _LANDMARK_ROWS[b], _LANDMARK_ROWS[c]]
+    for a, b, c in (
+        ("left_hip", "left_knee", "left_ankle"),
+        ("right_hip", "right_knee", "right_ankle"),
+        ("left_shoulder", "left_hip", "left_knee"),
+        ("right_shoulder", "right_hip", "right_knee"),
+        ("left_shoulder", "left_elbow", "left_wrist"),
+        ("right_shoulder", "right_elbow", "right_wrist"),
+    )
+])
+
+
+def pose_to_array(pose: dict) -> np.ndarray:
+    """Convert a landmark dict to a dense (13, 2) x,y array in POSE_LANDMARKS order."""
+    return np.array(
+        [[pose[name]["x"], pose[name]["y"]] for name in POSE_LANDMARKS],
+        dtype=np.float64,
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _ensure_model_file() -> Path:
+    """Download the pose landmarker model once per process.
+
+    The download streams to a .part file and is moved into place with
+    os.replace, so concurrent or interrupted runs never see a partial model.
+    """
+    with _model_lock:
+        if not POSE_MODEL_PATH.exists():
+            POSE_MODEL_PATH.parent.mkdir(parents=True, exist_ok=True)
+            logger.info("Downloading pose landmarker model...")
+            part_path = POSE_MODEL_PATH.with_suffix(".part")
+            with urllib.request.urlopen(POSE_MODEL_URL) as response, open(part_path, "wb") as f:
+                while chunk := response.read(1 << 16):
+                    f.write(chunk)
+            os.replace(part_path, POSE_MODEL_PATH)
+            logger.info("Model downloaded to %s", POSE_MODEL_PATH)
+    return POSE_MODEL_PATH
+
 
 class GaitRecognitionService:
     """Gait analysis and embedding extraction using MediaPipe.
@@ -48,35 +122,27 @@ class GaitRecognitionService:
 
         # Per-track pose buffers: track_key -> deque of poses
         self._track_buffers: dict[str, deque] = {}
-        # Track last activity timestamps: track_key -> timestamp
-        self._track_last_seen: dict[str, float] = {}
+        # Track last activity (time.monotonic_ns), ordered least- to most-recently seen
+        self._track_last_seen: OrderedDict[str, int] = OrderedDict()
 
         # Legacy single buffer for backward compatibility
         self._pose_buffer: deque = deque(maxlen=self.sequence_length)
 
+        # Reused RGB conversion target, reallocated only on resolution change
+        self._rgb_scratch: Optional[np.ndarray] = None
+
     def _ensure_initialized(self) -> bool:
         """Lazy initialization of MediaPipe PoseLandmarker (new tasks API)."""
         if self._initialized:
             return True
 
         try:
-            import mediapipe as mp
             from mediapipe.tasks import python
             from mediapipe.tasks.python import vision
-            from pathlib import Path
-            import urllib.request
 
             logger.info("Initializing MediaPipe PoseLandmarker...")
 
-            # Download model if not present
-            model_path = Path("models/pose_landmarker_lite.task")
-            model_path.parent.mkdir(parents=True, exist_ok=True)
-
-            if not model_path.exists():
-                logger.info("Downloading pose landmarker model...")
-                url = "https://storage.googleapis.com/mediapipe-models/pose_landmarker/pose_landmarker_lite/float16/1/pose_landmarker_lite.task"
-                urllib.request.urlretrieve(url, model_path)
-                logger.info("Model downloaded to %s", model_path)
+            model_path = _ensure_model_file()
 
             # Create PoseLandmarker
             base_options = python.BaseOptions(model_asset_path=str(model_path))
@@ -100,17 +166,26 @@ class GaitRecognitionService:
 
         Returns dict with normalized landmark coordinates or None.
         """
-        if not self._ensure_initialized():
+        if not _HAVE_MP or not self._ensure_initialized():
             return None
 
-        import mediapipe as mp
-        import cv2
+        # Downscale before detection; the landmarker resizes internally and
+        # returns normalized coordinates, so no unprojection is needed
+        target_width = self._config.detection_input_width
+        if 0 < target_width < frame.shape[1]:
+            scale = target_width / frame.shape[1]
+            frame = cv2.resize(
+                frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+            )
 
-        # Convert BGR to RGB
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        # Convert BGR to RGB into a reused buffer (avoids a full-frame
+        # allocation per call; mp.Image copies the data on construction)
+        if self._rgb_scratch is None or self._rgb_scratch.shape != frame.shape:
+            self._rgb_scratch = np.empty_like(frame)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb_scratch)
 
         # Create MediaPipe Image
-        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb_frame)
+        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=self._rgb_scratch)
 
         # Detect pose
         results = self._pose.detect(mp_image)
@@ -201,8 +276,8 @@ class GaitRecognitionService:
             return 0.0
         return intersection / union
 
-    def add_pose_to_buffer(self, pose: dict) -> int:
-        """Add pose to sequence buffer. Returns buffer length."""
+    def add_pose_to_buffer(self, pose: Union[dict, np.ndarray]) -> int:
+        """Add pose (landmark dict or pose_to_array form) to sequence buffer. Returns buffer length."""
         self._pose_buffer.append(pose)
         return len(self._pose_buffer)
 
@@ -220,14 +295,17 @@ class GaitRecognitionService:
         """Create unique key for track buffer."""
         return f"{camera_source}_{track_id}"
 
-    def _cleanup_stale_tracks(self) -> None:
+    def _cleanup_stale_tracks(self, now_ns: Optional[int] = None) -> None:
         """Remove tracks that have been inactive beyond timeout."""
-        now = time.time()
-        timeout = self._config.track_timeout
-        stale_keys = [
-            key for key, last_seen in self._track_last_seen.items()
-            if now - last_seen > timeout
-        ]
+        if now_ns is None:
+            now_ns = time.monotonic_ns()
+        timeout_ns = int(self._config.track_timeout * 1e9)
+        stale_keys = []
+        # Oldest first, so the first fresh track ends the scan
+        for key, last_seen in self._track_last_seen.items():
+            if now_ns - last_seen <= timeout_ns:
+                break
+            stale_keys.append(key)
         for key in stale_keys:
             self._track_buffers.pop(key, None)
             self._track_last_seen.pop(key, None)
@@ -237,29 +315,41 @@ class GaitRecognitionService:
         self,
         camera_source: str,
         track_id: int,
-        pose: dict,
+        pose: Union[dict, np.ndarray],
+        now_ns: Optional[int] = None,
     ) -> int:
-        """Add pose to track-specific buffer. Returns buffer length."""
-        self._cleanup_stale_tracks()
+        """
+        Add pose (landmark dict or pose_to_array form) to track-specific buffer.
+
+        Args:
+            camera_source: Camera identifier
+            track_id: Track ID for this person
+            pose: Pose landmarks
+            now_ns: Frame timestamp from time.monotonic_ns(); pass one value
+                for every track updated from the same frame
+
+        Returns:
+            Buffer length
+        """
+        if now_ns is None:
+            now_ns = time.monotonic_ns()
+        self._cleanup_stale_tracks(now_ns)
 
         track_key = self._make_track_key(camera_source, track_id)
 
         # Create buffer if needed (respecting max tracks)
         if track_key not in self._track_buffers:
             if len(self._track_buffers) >= self._config.max_tracked_persons:
-                # Remove oldest track
-                oldest_key = min(
-                    self._track_last_seen.keys(),
-                    key=lambda k: self._track_last_seen[k],
-                )
+                # Remove least recently seen track
+                oldest_key, _ = self._track_last_seen.popitem(last=False)
                 self._track_buffers.pop(oldest_key, None)
-                self._track_last_seen.pop(oldest_key, None)
                 logger.debug("Evicted oldest track: %s", oldest_key)
 
             self._track_buffers[track_key] = deque(maxlen=self.sequence_length)
 
         self._track_buffers[track_key].append(pose)
-        self._track_last_seen[track_key] = time.time()
+        self._track_last_seen[track_key] = now_ns
+        self._track_last_seen.move_to_end(track_key)
         return len(self._track_buffers[track_key])
 
     def get_track_buffer_length(self, camera_source: str, track_id: int) -> int:
@@ -294,12 +384,16 @@ class GaitRecognitionService:
         p3: dict,
     ) -> float:
         """Compute angle at p2 formed by p1-p2-p3."""
-        v1 = np.array([p1["x"] - p2["x"], p1["y"] - p2["y"]])
-        v2 = np.array([p3["x"] - p2["x"], p3["y"] - p2["y"]])
-
-        cos_angle = np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2) + 1e-6)
-        angle = np.arccos(np.clip(cos_angle, -1.0, 1.0))
-        return float(angle)
+        # Plain float math: NumPy dispatch dominates for 2-element vectors
+        dx1 = p1["x"] - p2["x"]
+        dy1 = p1["y"] - p2["y"]
+        dx2 = p3["x"] - p2["x"]
+        dy2 = p3["y"] - p2["y"]
+
+        cos_angle = (dx1 * dx2 + dy1 * dy2) / (
+            math.hypot(dx1, dy1) * math.hypot(dx2, dy2) + 1e-6
+        )
+        return math.acos(max(-1.0, min(1.0, cos_angle)))
 
     def _extract_frame_features(self, pose: dict) -> np.ndarray:
         """Extract feature vector from single pose frame."""
@@ -373,68 +467,108 @@ class GaitRecognitionService:
 
         return np.array(features, dtype=np.float32)
 
-    def compute_gait_embedding(self) -> Optional[np.ndarray]:
-        """
-        Compute gait embedding from buffered pose sequence.
-
-        Returns 256-dim embedding or None if buffer not full.
+    @staticmethod
+    def _batch_frame_features(coords: np.ndarray) -> np.ndarray:
         """
-        if not self.is_buffer_full():
-            logger.warning(
-                "Buffer not full: %d/%d",
-                len(self._pose_buffer),
-                self.sequence_length,
-            )
-            return None
+        Vectorized equivalent of _extract_frame_features.
 
-        # Extract features from each frame
-        frame_features = []
-        for pose in self._pose_buffer:
-            features = self._extract_frame_features(pose)
-            frame_features.append(features)
+        Args:
+            coords: Array of shape (..., 13, 2) with landmark x,y in
+                POSE_LANDMARKS order
 
-        frame_features = np.array(frame_features)
+        Returns:
+            Array of shape (..., 12) with the same features per frame
+        """
+        v1 = coords[..., _ANGLE_INDICES[:, 0], :] - coords[..., _ANGLE_INDICES[:, 1], :]
+        v2 = coords[..., _ANGLE_INDICES[:, 2], :] - coords[..., _ANGLE_INDICES[:, 1], :]
+        cos_angle = np.sum(v1 * v2, axis=-1) / (
+            np.linalg.norm(v1, axis=-1) * np.linalg.norm(v2, axis=-1) + 1e-6
+        )
+        angles = np.arccos(np.clip(cos_angle, -1.0, 1.0))
+
+        x = coords[..., 0]
+        y = coords[..., 1]
+        shoulder_width = np.abs(x[..., _LS] - x[..., _RS])
+        hip_width = np.abs(x[..., _LH] - x[..., _RH])
+        shoulder_y = (y[..., _LS] + y[..., _RS]) / 2
+        hip_y = (y[..., _LH] + y[..., _RH]) / 2
+        ankle_y = (y[..., _LA] + y[..., _RA]) / 2
+        torso_length = np.abs(shoulder_y - hip_y)
+        leg_length = np.abs(hip_y - ankle_y)
+
+        proportions = np.stack([
+            shoulder_width,
+            hip_width,
+            torso_length,
+            leg_length,
+            shoulder_width / (hip_width + 1e-6),
+            torso_length / (leg_length + 1e-6),
+        ], axis=-1)
 
-        # Temporal statistics
-        embedding_parts = []
+        return np.concatenate([angles, proportions], axis=-1).astype(np.float32)
 
-        # Mean features across sequence
-        embedding_parts.append(np.mean(frame_features, axis=0))
+    @staticmethod
+    def _embed_frame_features(frame_features: np.ndarray) -> np.ndarray:
+        """
+        Reduce per-frame features to L2-normalized 256-dim embeddings.
 
-        # Std features across sequence
-        embedding_parts.append(np.std(frame_features, axis=0))
+        Args:
+            frame_features: Array of shape (L, 12) or (T, L, 12)
 
-        # Min features
-        embedding_parts.append(np.min(frame_features, axis=0))
+        Returns:
+            Array of shape (256,) or (T, 256)
+        """
+        axis = -2
+        f = FEATURES_PER_FRAME
+        out = np.zeros(
+            frame_features.shape[:-2] + (EMBEDDING_DIM,), dtype=np.float32
+        )
 
-        # Max features
-        embedding_parts.append(np.max(frame_features, axis=0))
+        # Temporal statistics: mean, std, min, max
+        np.mean(frame_features, axis=axis, out=out[..., 0:f])
+        np.std(frame_features, axis=axis, out=out[..., f:2 * f])
+        np.min(frame_features, axis=axis, out=out[..., 2 * f:3 * f])
+        np.max(frame_features, axis=axis, out=out[..., 3 * f:4 * f])
 
         # First derivative statistics (velocity)
-        velocity = np.diff(frame_features, axis=0)
-        embedding_parts.append(np.mean(velocity, axis=0))
-        embedding_parts.append(np.std(velocity, axis=0))
+        velocity = np.diff(frame_features, axis=axis)
+        np.mean(velocity, axis=axis, out=out[..., 4 * f:5 * f])
+        np.std(velocity, axis=axis, out=out[..., 5 * f:6 * f])
 
         # Second derivative statistics (acceleration)
-        acceleration = np.diff(velocity, axis=0)
-        embedding_parts.append(np.mean(acceleration, axis=0))
-        embedding_parts.append(np.std(acceleration, axis=0))
+        acceleration = np.diff(velocity, axis=axis)
+        np.mean(acceleration, axis=axis, out=out[..., 6 * f:7 * f])
+        np.std(acceleration, axis=axis, out=out[..., 7 * f:8 * f])
 
-        # Concatenate all parts
-        embedding = np.concatenate(embedding_parts)
+        # L2 normalize in place; remaining dimensions stay zero-padded
+        norm = np.linalg.norm(out, axis=-1, keepdims=True)
+        np.divide(out, norm, out=out, where=norm > 0)
 
-        # Pad or truncate to 256 dimensions
-        if len(embedding) < 256:
-            embedding = np.pad(embedding, (0, 256 - len(embedding)))
-        else:
-            embedding = embedding[:256]
+        return out
 
-        # L2 normalize
-        norm = np.linalg.norm(embedding)
-        if norm > 0:
-            embedding = embedding / norm
+    def _embedding_from_buffer(self, buffer) -> np.ndarray:
+        """Compute gait embedding from a full sequence of poses."""
+        coords = np.array([
+            pose if isinstance(pose, np.ndarray) else pose_to_array(pose)
+            for pose in buffer
+        ])
+        return self._embed_frame_features(self._batch_frame_features(coords))
 
-        return embedding.astype(np.float32)
+    def compute_gait_embedding(self) -> Optional[np.ndarray]:
+        """
+        Compute gait embedding from buffered pose sequence.
+
+        Returns 256-dim embedding or None if buffer not full.
+        """
+        if not self.is_buffer_full():
+            logger.warning(
+                "Buffer not full: %d/%d",
+                len(self._pose_buffer),
+                self.sequence_length,
+            )
+            return None
+
+        return self._embedding_from_buffer(self._pose_buffer)
 
     def compute_track_gait_embedding(
         self,
@@ -452,41 +586,7 @@ class GaitRecognitionService:
         if not buffer or len(buffer) < self.sequence_length:
             return None
 
-        # Extract features from each frame in track buffer
-        frame_features = []
-        for pose in buffer:
-            features = self._extract_frame_features(pose)
-            frame_features.append(features)
-
-        frame_features = np.array(frame_features)
-
-        # Same temporal statistics as compute_gait_embedding
-        embedding_parts = []
-        embedding_parts.append(np.mean(frame_features, axis=0))
-        embedding_parts.append(np.std(frame_features, axis=0))
-        embedding_parts.append(np.min(frame_features, axis=0))
-        embedding_parts.append(np.max(frame_features, axis=0))
-
-        velocity = np.diff(frame_features, axis=0)
-        embedding_parts.append(np.mean(velocity, axis=0))
-        embedding_parts.append(np.std(velocity, axis=0))
-
-        acceleration = np.diff(velocity, axis=0)
-        embedding_parts.append(np.mean(acceleration, axis=0))
-        embedding_parts.append(np.std(acceleration, axis=0))
-
-        embedding = np.concatenate(embedding_parts)
-
-        if len(embedding) < 256:
-            embedding = np.pad(embedding, (0, 256 - len(embedding)))
-        else:
-            embedding = embedding[:256]
-
-        norm = np.linalg.norm(embedding)
-        if norm > 0:
-            embedding = embedding / norm
-
-        return embedding.astype(np.float32)
+        return self._embedding_from_buffer(buffer)
 
     async def enroll_gait(
         self,
@@ -2,25 +2,173 @@
 Database repository for person recognition.
 """
 
+import io
 import json
 import logging
+from collections import OrderedDict
 from datetime import datetime
 from typing import Optional
 from uuid import UUID
 
+import asyncpg
 import numpy as np
 
 from ..storage.database import get_db_pool
 
 logger = logging.getLogger("atlas.vision.recognition.repository")
 
+FACE_EMBEDDING_DIM = 512
+GAIT_EMBEDDING_DIM = 256
+
+# Process-local cache of recent centroid matches
+MATCH_CACHE_SIZE = 1024
+MATCH_CACHE_MIN_SIMILARITY = 0.95
+
+# Binary COPY framing: 11-byte signature + int32 flags + int32 extension length
+_COPY_HEADER_LEN = 19
+
 
 class PersonRepository:
     """Repository for person recognition database operations."""
 
-    def _to_pgvector(self, embedding: np.ndarray) -> str:
-        """Convert numpy embedding to pgvector format string."""
-        return "[" + ",".join(str(float(x)) for x in embedding.tolist()) + "]"
+    def __init__(self):
+        # (kind, threshold, sign bits of probe) -> (probe, centroid, match), LRU ordered
+        self._match_cache: OrderedDict[
+            tuple, tuple[np.ndarray, np.ndarray, dict]
+        ] = OrderedDict()
+
+    def session(self):
+        """
+        Pin one DB connection for a burst of repository calls.
+
+        Usage: ``async with repo.session(): ...`` - see DatabasePool.session.
+        """
+        return get_db_pool().session()
+
+    def _match_cache_get(
+        self,
+        kind: str,
+        embedding: np.ndarray,
+        threshold: float,
+    ) -> tuple[tuple, Optional[dict]]:
+        """
+        Look up a cached centroid match for a normalized probe.
+
+        Keys on the probe's sign bits (a cheap LSH bucket); a hit also
+        requires cosine >= MATCH_CACHE_MIN_SIMILARITY to the cached probe.
+        The similarity is rescored against the cached centroid, so a hit
+        that falls to the threshold or below counts as a miss.
+        Returns the cache key and the match (or None on miss).
+        """
+        key = (kind, threshold, np.packbits(embedding > 0).tobytes())
+        entry = self._match_cache.get(key)
+        if entry is None:
+            return key, None
+        probe, centroid, match = entry
+        if float(np.dot(probe, embedding)) < MATCH_CACHE_MIN_SIMILARITY:
+            return key, None
+        similarity = float(np.dot(centroid, embedding))
+        if similarity <= threshold:
+            return key, None
+        self._match_cache.move_to_end(key)
+        return key, {**match, "similarity": similarity}
+
+    def _match_cache_put(
+        self,
+        key: tuple,
+        embedding: np.ndarray,
+        centroid: np.ndarray,
+        match: dict,
+    ) -> None:
+        """Store a match, evicting the least recently used entry when full."""
+        self._match_cache[key] = (embedding.copy(), centroid, dict(match))
+        self._match_cache.move_to_end(key)
+        if len(self._match_cache) > MATCH_CACHE_SIZE:
+            self._match_cache.popitem(last=False)
+
+    def invalidate_match_cache(self, kind: Optional[str] = None) -> None:
+        """Drop cached matches for one kind ("face"/"gait") or all."""
+        if kind is None:
+            self._match_cache.clear()
+            return
+        for key in [k for k in self._match_cache if k[0] == kind]:
+            del self._match_cache[key]
+
+    def _to_pgvector(self, embedding: np.ndarray):
+        """
+        Convert numpy embedding to a pgvector query parameter.
+
+        With the binary codec registered the array is sent as-is;
+        otherwise it is formatted as pgvector text.
+        """
+        embedding = embedding.astype(np.float32, copy=False)
+        if get_db_pool().has_vector_codec:
+            return embedding
+        # %.7g keeps float4 precision (~7 digits) in fewer bytes than repr
+        return "[" + ",".join(np.char.mod("%.7g", embedding)) + "]"
+
+    def _normalize(self, embedding: np.ndarray) -> np.ndarray:
+        """
+        L2-normalize an embedding to float32.
+
+        Stored embeddings and probes are unit-length so inner product
+        (<#>) equals cosine similarity.
+        """
+        embedding = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        if norm > 0 and abs(norm - 1.0) > 1e-5:
+            embedding = embedding / norm
+        return embedding
+
+    def _from_pgvector(self, value, dim: int = -1) -> np.ndarray:
+        """
+        Convert a pgvector column value (array or text) to numpy.
+
+        Text values are parsed in a single C-level pass. Pass dim > 0 to
+        check the result against the column width.
+
+        Raises:
+            ValueError: If dim > 0 and the vector has a different length
+        """
+        if isinstance(value, str):
+            arr = np.fromstring(value[1:-1], sep=",", dtype=np.float32)
+        else:
+            arr = np.asarray(value, dtype=np.float32)
+        if dim > 0 and arr.size != dim:
+            raise ValueError(f"Expected {dim}-dim vector, got {arr.size}")
+        return arr
+
+    def _parse_copy_vectors(self, payload: bytes, dim: int) -> np.ndarray:
+        """
+        Decode a binary COPY of a single vector column into an (n, dim) array.
+
+        Each tuple is int16 field count, int32 length, then pgvector's
+        binary form: uint16 dim, uint16 unused, dim big-endian float32.
+        """
+        ext_len = int.from_bytes(payload[15:_COPY_HEADER_LEN], "big")
+        body = memoryview(payload)[_COPY_HEADER_LEN + ext_len:-2]  # drop trailer
+        row_dtype = np.dtype([
+            ("nfields", ">i2"),
+            ("length", ">i4"),
+            ("dim", ">u2"),
+            ("unused", ">u2"),
+            ("values", ">f4", (dim,)),
+        ])
+        rows = np.frombuffer(body, dtype=row_dtype)
+        return rows["values"].astype(np.float32)
+
+    async def _copy_embeddings(self, query: str, dim: int, *args) -> list[np.ndarray]:
+        """Fetch a single vector column via binary COPY."""
+        buf = io.BytesIO()
+        async with get_db_pool().acquire() as conn:
+            await conn.copy_from_query(query, *args, output=buf, format="binary")
+        return list(self._parse_copy_vectors(buf.getvalue(), dim))
+
+    async def _fetchrow_prepared(self, query: str, *args):
+        """Run a hot query through a per-connection prepared statement."""
+        async with get_db_pool().acquire() as conn:
+            stmt = await conn.prepare_cached(query)
+            return await stmt.fetchrow(*args)
 
     async def create_person(
         self,
@@ -62,8 +210,8 @@ class PersonRepository:
         )
         return dict(row) if row else None
 
-    async def list_persons(self, include_unknown: bool = True) -> list[dict]:
-        """List all persons."""
+    async def list_persons(self, include_unknown: bool = True) -> list[asyncpg.Record]:
+        """List all persons (records support read access by column name)."""
         pool = get_db_pool()
         if include_unknown:
             rows = await pool.fetch(
@@ -73,7 +221,7 @@ class PersonRepository:
             rows = await pool.fetch(
                 "SELECT * FROM persons WHERE is_known = TRUE ORDER BY name"
             )
-        return [dict(row) for row in rows]
+        return rows
 
     async def update_last_seen(self, person_id: UUID) -> None:
         """Update last seen timestamp."""
@@ -94,15 +242,35 @@ class PersonRepository:
     ) -> UUID:
         """Add a face embedding for a person and update centroid."""
         pool = get_db_pool()
+        embedding = self._normalize(embedding)
         embedding_str = self._to_pgvector(embedding)
 
-        # Insert the embedding
+        # Insert the embedding and fold it into the centroid in one round
+        # trip. The centroid is a weighted average computed server-side
+        # (pgvector >= 0.7); 1/(n+1) is dropped since l2_normalize removes
+        # scale, and the UPDATE's row lock serializes concurrent adds.
         row = await pool.fetchrow(
             """
-            INSERT INTO face_embeddings
-            (person_id, embedding, quality_score, source, reference_image, image_format)
-            VALUES ($1, $2::vector, $3, $4, $5, $6)
-            RETURNING id
+            WITH inserted AS (
+                INSERT INTO face_embeddings
+                (person_id, embedding, quality_score, source, reference_image, image_format)
+                VALUES ($1, $2::vector, $3, $4, $5, $6)
+                RETURNING id
+            ), centroid AS (
+                UPDATE persons
+                SET face_centroid = l2_normalize(
+                        CASE
+                            WHEN face_centroid IS NULL OR COALESCE(face_sample_count, 0) = 0
+                            THEN $2::vector
+                            ELSE face_centroid
+                                * array_fill(face_sample_count::real, ARRAY[vector_dims(face_centroid)])::vector
+                                + $2::vector
+                        END
+                    ),
+                    face_sample_count = COALESCE(face_sample_count, 0) + 1
+                WHERE id = $1
+            )
+            SELECT id FROM inserted
             """,
             person_id,
             embedding_str,
@@ -111,81 +279,83 @@ class PersonRepository:
             reference_image,
             image_format,
         )
-        embedding_id = row["id"]
-
-        # Update centroid using weighted average (same pattern as speaker ID)
-        await self._update_face_centroid(person_id, embedding)
-
-        return embedding_id
+        self.invalidate_match_cache("face")
+        return row["id"]
 
-    async def _update_face_centroid(
+    async def add_face_embeddings_batch(
         self,
         person_id: UUID,
-        new_embedding: np.ndarray,
-    ) -> None:
-        """Update person's face centroid with weighted average."""
-        pool = get_db_pool()
-
-        # Get current centroid and sample count
-        person = await pool.fetchrow(
-            "SELECT face_centroid, face_sample_count FROM persons WHERE id = $1",
-            person_id,
-        )
-        if not person:
-            return
-
-        sample_count = person["face_sample_count"] or 0
-        old_centroid_str = person["face_centroid"]
-
-        if old_centroid_str and sample_count > 0:
-            # Parse existing centroid
-            centroid_list = [float(x) for x in str(old_centroid_str).strip("[]").split(",")]
-            old_centroid = np.array(centroid_list, dtype=np.float32)
-
-            # Weighted average (more weight to existing if many samples)
-            new_centroid = (old_centroid * sample_count + new_embedding) / (sample_count + 1)
-        else:
-            new_centroid = new_embedding.copy()
-
-        # L2 normalize for cosine similarity
-        norm = np.linalg.norm(new_centroid)
-        if norm > 0:
-            new_centroid = new_centroid / norm
-
-        centroid_str = self._to_pgvector(new_centroid)
+        embeddings: list[np.ndarray],
+        quality_scores: Optional[list[float]] = None,
+        source: str = "enrollment",
+    ) -> list[UUID]:
+        """
+        Add several face embeddings for a person in one insert.
 
-        await pool.execute(
-            """
-            UPDATE persons
-            SET face_centroid = $1::vector, face_sample_count = $2
-            WHERE id = $3
-            """,
-            centroid_str,
-            sample_count + 1,
-            person_id,
-        )
+        The centroid is recomputed once afterwards as the server-side mean
+        of all the person's embeddings, instead of once per embedding.
+        """
+        if not embeddings:
+            return []
+        if quality_scores is None:
+            quality_scores = [0.0] * len(embeddings)
+
+        vectors = [self._to_pgvector(self._normalize(e)) for e in embeddings]
+
+        async with get_db_pool().acquire() as conn:
+            async with conn.transaction():
+                rows = await conn.fetch(
+                    """
+                    INSERT INTO face_embeddings (person_id, embedding, quality_score, source)
+                    SELECT $1, t.embedding, t.quality_score, $2
+                    FROM unnest($3::vector[], $4::float8[]) AS t(embedding, quality_score)
+                    RETURNING id
+                    """,
+                    person_id,
+                    source,
+                    vectors,
+                    quality_scores,
+                )
+                await conn.execute(
+                    """
+                    UPDATE persons
+                    SET face_centroid = agg.centroid, face_sample_count = agg.sample_count
+                    FROM (
+                        SELECT l2_normalize(AVG(embedding)) AS centroid, COUNT(*) AS sample_count
+                        FROM face_embeddings
+                        WHERE person_id = $1
+                    ) agg
+                    WHERE id = $1
+                    """,
+                    person_id,
+                )
+
+        self.invalidate_match_cache("face")
+        return [row["id"] for row in rows]
 
     async def find_matching_face(
         self,
         embedding: np.ndarray,
         threshold: float = 0.6,
     ) -> Optional[dict]:
-        """Find matching face using cosine similarity."""
-        pool = get_db_pool()
-        embedding_str = self._to_pgvector(embedding)
-        row = await pool.fetchrow(
+        """Find matching face using cosine similarity (inner product of unit vectors)."""
+        embedding_str = self._to_pgvector(self._normalize(embedding))
+        row = await self._fetchrow_prepared(
             """
-            SELECT
-                fe.id as embedding_id,
-                fe.person_id,
-                p.name,
-                p.is_known,
-                1 - (fe.embedding <=> $1::vector) as similarity
-            FROM face_embeddings fe
-            JOIN persons p ON fe.person_id = p.id
-            WHERE 1 - (fe.embedding <=> $1::vector) > $2
-            ORDER BY fe.embedding <=> $1::vector
-            LIMIT 1
+            SELECT embedding_id, person_id, name, is_known, -distance as similarity
+            FROM (
+                SELECT
+                    fe.id as embedding_id,
+                    fe.person_id,
+                    p.name,
+                    p.is_known,
+                    fe.embedding <#> $1::vector as distance
+                FROM face_embeddings fe
+                JOIN persons p ON fe.person_id = p.id
+                ORDER BY distance
+                LIMIT 1
+            ) nearest
+            WHERE -distance > $2
             """,
             embedding_str,
             threshold,
@@ -203,15 +373,35 @@ class PersonRepository:
     ) -> UUID:
         """Add a gait embedding for a person and update centroid."""
         pool = get_db_pool()
+        embedding = self._normalize(embedding)
         embedding_str = self._to_pgvector(embedding)
 
-        # Insert the embedding
+        # Insert the embedding and fold it into the centroid in one round
+        # trip. The centroid is a weighted average computed server-side
+        # (pgvector >= 0.7); 1/(n+1) is dropped since l2_normalize removes
+        # scale, and the UPDATE's row lock serializes concurrent adds.
         row = await pool.fetchrow(
             """
-            INSERT INTO gait_embeddings
-            (person_id, embedding, capture_duration_ms, frame_count, walking_direction, source)
-            VALUES ($1, $2::vector, $3, $4, $5, $6)
-            RETURNING id
+            WITH inserted AS (
+                INSERT INTO gait_embeddings
+                (person_id, embedding, capture_duration_ms, frame_count, walking_direction, source)
+                VALUES ($1, $2::vector, $3, $4, $5, $6)
+                RETURNING id
+            ), centroid AS (
+                UPDATE persons
+                SET gait_centroid = l2_normalize(
+                        CASE
+                            WHEN gait_centroid IS NULL OR COALESCE(gait_sample_count, 0) = 0
+                            THEN $2::vector
+                            ELSE gait_centroid
+                                * array_fill(gait_sample_count::real, ARRAY[vector_dims(gait_centroid)])::vector
+                                + $2::vector
+                        END
+                    ),
+                    gait_sample_count = COALESCE(gait_sample_count, 0) + 1
+                WHERE id = $1
+            )
+            SELECT id FROM inserted
             """,
             person_id,
             embedding_str,
@@ -220,81 +410,32 @@ class PersonRepository:
             walking_direction,
             source,
         )
-        embedding_id = row["id"]
-
-        # Update centroid using weighted average
-        await self._update_gait_centroid(person_id, embedding)
-
-        return embedding_id
-
-    async def _update_gait_centroid(
-        self,
-        person_id: UUID,
-        new_embedding: np.ndarray,
-    ) -> None:
-        """Update person's gait centroid with weighted average."""
-        pool = get_db_pool()
-
-        # Get current centroid and sample count
-        person = await pool.fetchrow(
-            "SELECT gait_centroid, gait_sample_count FROM persons WHERE id = $1",
-            person_id,
-        )
-        if not person:
-            return
-
-        sample_count = person["gait_sample_count"] or 0
-        old_centroid_str = person["gait_centroid"]
-
-        if old_centroid_str and sample_count > 0:
-            # Parse existing centroid
-            centroid_list = [float(x) for x in str(old_centroid_str).strip("[]").split(",")]
-            old_centroid = np.array(centroid_list, dtype=np.float32)
-
-            # Weighted average
-            new_centroid = (old_centroid * sample_count + new_embedding) / (sample_count + 1)
-        else:
-            new_centroid = new_embedding.copy()
-
-        # L2 normalize for cosine similarity
-        norm = np.linalg.norm(new_centroid)
-        if norm > 0:
-            new_centroid = new_centroid / norm
-
-        centroid_str = self._to_pgvector(new_centroid)
-
-        await pool.execute(
-            """
-            UPDATE persons
-            SET gait_centroid = $1::vector, gait_sample_count = $2
-            WHERE id = $3
-            """,
-            centroid_str,
-            sample_count + 1,
-            person_id,
-        )
+        self.invalidate_match_cache("gait")
+        return row["id"]
 
     async def find_matching_gait(
         self,
         embedding: np.ndarray,
         threshold: float = 0.5,
     ) -> Optional[dict]:
-        """Find matching gait using cosine similarity."""
-        pool = get_db_pool()
-        embedding_str = self._to_pgvector(embedding)
-        row = await pool.fetchrow(
+        """Find matching gait using cosine similarity (inner product of unit vectors)."""
+        embedding_str = self._to_pgvector(self._normalize(embedding))
+        row = await self._fetchrow_prepared(
             """
-            SELECT
-                ge.id as embedding_id,
-                ge.person_id,
-                p.name,
-                p.is_known,
-                1 - (ge.embedding <=> $1::vector) as similarity
-            FROM gait_embeddings ge
-            JOIN persons p ON ge.person_id = p.id
-            WHERE 1 - (ge.embedding <=> $1::vector) > $2
-            ORDER BY ge.embedding <=> $1::vector
-            LIMIT 1
+            SELECT embedding_id, person_id, name, is_known, -distance as similarity
+            FROM (
+                SELECT
+                    ge.id as embedding_id,
+                    ge.person_id,
+                    p.name,
+                    p.is_known,
+                    ge.embedding <#> $1::vector as distance
+                FROM gait_embeddings ge
+                JOIN persons p ON ge.person_id = p.id
+                ORDER BY distance
+                LIMIT 1
+            ) nearest
+            WHERE -distance > $2
             """,
             embedding_str,
             threshold,
@@ -312,26 +453,40 @@ class PersonRepository:
         Uses pgvector native search against gait_centroid column for O(log n)
         performance with ivfflat index. Scales to thousands of persons.
         """
-        pool = get_db_pool()
+        embedding = self._normalize(embedding)
+        cache_key, cached = self._match_cache_get("gait", embedding, threshold)
+        if cached is not None:
+            return cached
+
         embedding_str = self._to_pgvector(embedding)
 
-        row = await pool.fetchrow(
+        row = await self._fetchrow_prepared(
             """
-            SELECT
-                id as person_id,
-                name,
-                is_known,
-                1 - (gait_centroid <=> $1::vector) as similarity
-            FROM persons
-            WHERE gait_centroid IS NOT NULL
-            AND 1 - (gait_centroid <=> $1::vector) > $2
-            ORDER BY gait_centroid <=> $1::vector
-            LIMIT 1
+            SELECT person_id, name, is_known, -distance as similarity, centroid
+            FROM (
+                SELECT
+                    id as person_id,
+                    name,
+                    is_known,
+                    gait_centroid as centroid,
+                    gait_centroid <#> $1::vector as distance
+                FROM persons
+                WHERE gait_centroid IS NOT NULL
+                ORDER BY distance
+                LIMIT 1
+            ) nearest
+            WHERE -distance > $2
             """,
             embedding_str,
             threshold,
         )
-        return dict(row) if row else None
+        if not row:
+            return None
+
+        match = dict(row)
+        centroid = self._from_pgvector(match.pop("centroid"), GAIT_EMBEDDING_DIM)
+        self._match_cache_put(cache_key, embedding, centroid, match)
+        return match
 
     async def log_recognition_event(
         self,
@@ -402,6 +557,7 @@ class PersonRepository:
 
         query = f"UPDATE persons SET {', '.join(updates)} WHERE id = ${param_idx}"
         result = await pool.execute(query, *params)
+        self.invalidate_match_cache()
         return result == "UPDATE 1"
 
     async def delete_person(self, person_id: UUID) -> bool:
@@ -411,27 +567,28 @@ class PersonRepository:
             "DELETE FROM persons WHERE id = $1",
             person_id,
         )
+        self.invalidate_match_cache()
         return result == "DELETE 1"
 
     async def get_person_embedding_counts(self, person_id: UUID) -> dict:
         """Get count of face and gait embeddings for a person."""
         pool = get_db_pool()
-        face_count = await pool.fetchval(
-            "SELECT COUNT(*) FROM face_embeddings WHERE person_id = $1",
-            person_id,
-        )
-        gait_count = await pool.fetchval(
-            "SELECT COUNT(*) FROM gait_embeddings WHERE person_id = $1",
+        row = await pool.fetchrow(
+            """
+            SELECT
+                (SELECT COUNT(*) FROM face_embeddings WHERE person_id = $1) AS face_count,
+                (SELECT COUNT(*) FROM gait_embeddings WHERE person_id = $1) AS gait_count
+            """,
             person_id,
         )
-        return {"face_embeddings": face_count, "gait_embeddings": gait_count}
+        return {"face_embeddings": row["face_count"], "gait_embeddings": row["gait_count"]}
 
     async def get_recent_recognition_events(
         self,
         person_id: Optional[UUID] = None,
         limit: int = 50,
-    ) -> list[dict]:
-        """Get recent recognition events."""
+    ) -> list[asyncpg.Record]:
+        """Get recent recognition events (records support read access by column name)."""
         pool = get_db_pool()
         if person_id:
             rows = await pool.fetch(
@@ -457,44 +614,36 @@ class PersonRepository:
                 """,
                 limit,
             )
-        return [dict(row) for row in rows]
+        return rows
 
     async def get_person_face_embeddings(self, person_id: UUID) -> list[np.ndarray]:
         """Get all face embeddings for a person."""
-        pool = get_db_pool()
-        rows = await pool.fetch(
+        return await self._copy_embeddings(
             "SELECT embedding FROM face_embeddings WHERE person_id = $1",
+            FACE_EMBEDDING_DIM,
             person_id,
         )
-        embeddings = []
-        for row in rows:
-            # pgvector returns as string, parse it
-            emb_str = str(row["embedding"])
-            emb_list = [float(x) for x in emb_str.strip("[]").split(",")]
-            embeddings.append(np.array(emb_list, dtype=np.float32))
-        return embeddings
 
     async def get_averaged_face_embedding(self, person_id: UUID) -> Optional[np.ndarray]:
         """
         Compute averaged (centroid) face embedding for a person.
 
         Uses weighted averaging like speaker ID for more stable recognition.
-        Multiple samples create a more robust representation.
+        Multiple samples create a more robust representation. The mean is
+        computed server-side so only one vector is transferred.
         """
-        embeddings = await self.get_person_face_embeddings(person_id)
-        if not embeddings:
+        pool = get_db_pool()
+        averaged = await pool.fetchval(
+            """
+            SELECT l2_normalize(AVG(embedding))
+            FROM face_embeddings
+            WHERE person_id = $1
+            """,
+            person_id,
+        )
+        if averaged is None:
             return None
-
-        # Stack and average
-        stacked = np.stack(embeddings)
-        averaged = np.mean(stacked, axis=0)
-
-        # L2 normalize for cosine similarity
-        norm = np.linalg.norm(averaged)
-        if norm > 0:
-            averaged = averaged / norm
-
-        return averaged
+        return self._from_pgvector(averaged, FACE_EMBEDDING_DIM)
 
     async def find_matching_face_averaged(
         self,
@@ -507,156 +656,191 @@ class PersonRepository:
         Uses pgvector native search against face_centroid column for O(log n)
         performance with ivfflat index. Scales to thousands of persons.
         """
-        pool = get_db_pool()
+        embedding = self._normalize(embedding)
+        cache_key, cached = self._match_cache_get("face", embedding, threshold)
+        if cached is not None:
+            return cached
+
         embedding_str = self._to_pgvector(embedding)
 
-        row = await pool.fetchrow(
+        row = await self._fetchrow_prepared(
             """
-            SELECT
-                id as person_id,
-                name,
-                is_known,
-                1 - (face_centroid <=> $1::vector) as similarity
-            FROM persons
-            WHERE face_centroid IS NOT NULL
-            AND 1 - (face_centroid <=> $1::vector) > $2
-            ORDER BY face_centroid <=> $1::vector
-            LIMIT 1
+            SELECT person_id, name, is_known, -distance as similarity, centroid
+            FROM (
+                SELECT
+                    id as person_id,
+                    name,
+                    is_known,
+                    face_centroid as centroid,
+                    face_centroid <#> $1::vector as distance
+                FROM persons
+                WHERE face_centroid IS NOT NULL
+                ORDER BY distance
+                LIMIT 1
+            ) nearest
+            WHERE -distance > $2
             """,
             embedding_str,
             threshold,
         )
-        return dict(row) if row else None
+        if not row:
+            return None
+
+        match = dict(row)
+        centroid = self._from_pgvector(match.pop("centroid"), FACE_EMBEDDING_DIM)
+        self._match_cache_put(cache_key, embedding, centroid, match)
+        return match
+
+    async def find_matching_faces_batch(
+        self,
+        embeddings: list[np.ndarray],
+        threshold: float = 0.6,
+    ) -> list[Optional[dict]]:
+        """
+        Match several face embeddings against centroids in one query.
+
+        Each probe runs as a LATERAL top-1 lookup over the unnested input
+        array, so N faces from one frame cost a single round trip.
+
+        Returns:
+            One match dict (or None) per input embedding, in input order
+        """
+        if not embeddings:
+            return []
+
+        pool = get_db_pool()
+        rows = await pool.fetch(
+            """
+            SELECT
+                q.idx,
+                m.person_id,
+                m.name,
+                m.is_known,
+                -m.distance as similarity
+            FROM unnest($1::vector[]) WITH ORDINALITY AS q(vec, idx),
+            LATERAL (
+                SELECT
+                    id as person_id,
+                    name,
+                    is_known,
+                    face_centroid <#> q.vec as distance
+                FROM persons
+                WHERE face_centroid IS NOT NULL
+                ORDER BY distance
+                LIMIT 1
+            ) m
+            WHERE -m.distance > $2
+            """,
+            [self._to_pgvector(self._normalize(embedding)) for embedding in embeddings],
+            threshold,
+        )
+
+        matches: list[Optional[dict]] = [None] * len(embeddings)
+        for row in rows:
+            match = dict(row)
+            matches[match.pop("idx") - 1] = match
+        return matches
 
     async def backfill_face_centroids(self) -> int:
         """
         Backfill face centroids for all persons with face embeddings.
 
         Call this after migration to populate centroids for existing data.
+        Centroids are averaged server-side in a single statement.
         Returns the number of persons updated.
         """
         pool = get_db_pool()
 
-        # Get all persons with face embeddings but no centroid
-        persons = await pool.fetch(
+        result = await pool.execute(
             """
-            SELECT DISTINCT p.id
-            FROM persons p
-            JOIN face_embeddings fe ON p.id = fe.person_id
-            WHERE p.face_centroid IS NULL
+            UPDATE persons p
+            SET face_centroid = sub.centroid, face_sample_count = sub.sample_count
+            FROM (
+                SELECT person_id,
+                       l2_normalize(AVG(embedding)) AS centroid,
+                       COUNT(*) AS sample_count
+                FROM face_embeddings
+                WHERE person_id IN (
+                    SELECT id FROM persons WHERE face_centroid IS NULL
+                )
+                GROUP BY person_id
+            ) sub
+            WHERE p.id = sub.person_id
+            AND p.face_centroid IS NULL
             """
         )
+        updated = int(result.split()[-1])
+        logger.info("Backfilled face centroids for %d persons", updated)
 
-        updated = 0
-        for person in persons:
-            person_id = person["id"]
-            embeddings = await self.get_person_face_embeddings(person_id)
-
-            if not embeddings:
-                continue
-
-            # Compute centroid
-            stacked = np.stack(embeddings)
-            centroid = np.mean(stacked, axis=0)
-
-            # L2 normalize
-            norm = np.linalg.norm(centroid)
-            if norm > 0:
-                centroid = centroid / norm
-
-            centroid_str = self._to_pgvector(centroid)
+        self.invalidate_match_cache("face")
 
-            await pool.execute(
-                """
-                UPDATE persons
-                SET face_centroid = $1::vector, face_sample_count = $2
-                WHERE id = $3
-                """,
-                centroid_str,
-                len(embeddings),
-                person_id,
-            )
-            updated += 1
-            logger.info("Backfilled face centroid for person %s (%d samples)", person_id, len(embeddings))
+        if updated:
+            # Reclaim the rewritten rows and refresh stats so the planner
+            # keeps choosing the vector index scan for centroid lookups
+            await pool.execute("VACUUM ANALYZE persons")
 
         return updated
 
     async def get_person_gait_embeddings(self, person_id: UUID) -> list[np.ndarray]:
         """Get all gait embeddings for a person."""
-        pool = get_db_pool()
-        rows = await pool.fetch(
+        return await self._copy_embeddings(
             "SELECT embedding FROM gait_embeddings WHERE person_id = $1",
+            GAIT_EMBEDDING_DIM,
             person_id,
         )
-        embeddings = []
-        for row in rows:
-            emb_str = str(row["embedding"])
-            emb_list = [float(x) for x in emb_str.strip("[]").split(",")]
-            embeddings.append(np.array(emb_list, dtype=np.float32))
-        return embeddings
 
     async def get_averaged_gait_embedding(self, person_id: UUID) -> Optional[np.ndarray]:
         """Compute averaged (centroid) gait embedding for a person."""
-        embeddings = await self.get_person_gait_embeddings(person_id)
-        if not embeddings:
+        pool = get_db_pool()
+        averaged = await pool.fetchval(
+            """
+            SELECT l2_normalize(AVG(embedding))
+            FROM gait_embeddings
+            WHERE person_id = $1
+            """,
+            person_id,
+        )
+        if averaged is None:
             return None
-
-        stacked = np.stack(embeddings)
-        averaged = np.mean(stacked, axis=0)
-
-        norm = np.linalg.norm(averaged)
-        if norm > 0:
-            averaged = averaged / norm
-
-        return averaged
+        return self._from_pgvector(averaged, GAIT_EMBEDDING_DIM)
 
     async def backfill_gait_centroids(self) -> int:
         """
         Backfill gait centroids for all persons with gait embeddings.
 
         Call this after migration to populate centroids for existing data.
+        Centroids are averaged server-side in a single statement.
         Returns the number of persons updated.
         """
         pool = get_db_pool()
 
-        persons = await pool.fetch(
+        result = await pool.execute(
             """
-            SELECT DISTINCT p.id
-            FROM persons p
-            JOIN gait_embeddings ge ON p.id = ge.person_id
-            WHERE p.gait_centroid IS NULL
+            UPDATE persons p
+            SET gait_centroid = sub.centroid, gait_sample_count = sub.sample_count
+            FROM (
+                SELECT person_id,
+                       l2_normalize(AVG(embedding)) AS centroid,
+                       COUNT(*) AS sample_count
+                FROM gait_embeddings
+                WHERE person_id IN (
+                    SELECT id FROM persons WHERE gait_centroid IS NULL
+                )
+                GROUP BY person_id
+            ) sub
+            WHERE p.id = sub.person_id
+            AND p.gait_centroid IS NULL
             """
         )
+        updated = int(result.split()[-1])
+        logger.info("Backfilled gait centroids for %d persons", updated)
 
-        updated = 0
-        for person in persons:
-            person_id = person["id"]
-            embeddings = await self.get_person_gait_embeddings(person_id)
-
-            if not embeddings:
-                continue
-
-            stacked = np.stack(embeddings)
-            centroid = np.mean(stacked, axis=0)
-
-            norm = np.linalg.norm(centroid)
-            if norm > 0:
-                centroid = centroid / norm
-
-            centroid_str = self._to_pgvector(centroid)
+        self.invalidate_match_cache("gait")
 
-            await pool.execute(
-                """
-                UPDATE persons
-                SET gait_centroid = $1::vector, gait_sample_count = $2
-                WHERE id = $3
-                """,
-                centroid_str,
-                len(embeddings),
-                person_id,
-            )
-            updated += 1
-            logger.info("Backfilled gait centroid for person %s (%d samples)", person_id, len(embeddings))
+        if updated:
+            # Reclaim the rewritten rows and refresh stats so the planner
+            # keeps choosing the vector index scan for centroid lookups
+            await pool.execute("VACUUM ANALYZE persons")
 
         return updated
 
@@ -6,16 +6,42 @@ Associates YOLO track IDs with recognized person IDs using face and gait.
 
 import logging
 import time
+from collections import defaultdict
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import Optional, ValuesView
 from uuid import UUID
 
 import numpy as np
 
 logger = logging.getLogger("atlas.vision.recognition.tracker")
 
+# Shared empty mapping for read-only lookups on cameras with no tracks
+_EMPTY: dict = {}
 
-@dataclass
+# Pixel size of the uniform grid cells used for point-in-track lookups
+GRID_CELL_SIZE = 64
+
+# Cameras with at least this many tracks scan last_seen as a NumPy array
+VECTORIZED_CLEANUP_MIN_TRACKS = 32
+
+# Below this many tracks, plain Python IoU beats NumPy array setup cost
+VECTORIZED_IOU_MIN_TRACKS = 8
+
+
+def _iou_scalar(a: list[int], b: list[int]) -> float:
+    """IoU of two [x1, y1, x2, y2] boxes using plain Python arithmetic."""
+    iw = min(a[2], b[2]) - max(a[0], b[0])
+    ih = min(a[3], b[3]) - max(a[1], b[1])
+    if iw <= 0 or ih <= 0:
+        return 0.0
+    inter = iw * ih
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    if union <= 0:
+        return 0.0
+    return inter / union
+
+
+@dataclass(slots=True)
 class TrackedPerson:
     """State for a tracked person."""
 
@@ -34,14 +60,15 @@ class TrackedPerson:
     needs_gait_enrollment: bool = False
     gait_enrolled: bool = False
 
-    # Timestamps
-    first_seen: float = field(default_factory=time.time)
-    last_seen: float = field(default_factory=time.time)
+    # Timestamps (set by TrackManager from the caller's frame time)
+    first_seen: float = 0.0
+    last_seen: float = 0.0
     last_face_match: float = 0.0
     last_gait_match: float = 0.0
 
     # Bounding box (pixel coordinates)
     bbox: list[int] = field(default_factory=lambda: [0, 0, 0, 0])
+    has_bbox: bool = False
 
 
 class TrackManager:
@@ -58,13 +85,102 @@ class TrackManager:
         from ..core.config import settings
 
         self._config = settings.recognition
+        # Resolved once; read on every matching / cleanup call
+        self._iou_threshold = self._config.iou_threshold
+        self._track_timeout = self._config.track_timeout
         # Per-camera track state: camera_source -> track_id -> TrackedPerson
-        self._tracks: dict[str, dict[int, TrackedPerson]] = {}
-
-    def _ensure_camera(self, camera_source: str) -> None:
-        """Ensure camera dict exists."""
-        if camera_source not in self._tracks:
-            self._tracks[camera_source] = {}
+        self._tracks: defaultdict[str, dict[int, TrackedPerson]] = defaultdict(dict)
+        # Per-camera stacked bboxes for IoU matching, rebuilt lazily after
+        # any track is created, moved or removed
+        self._bbox_index: dict[str, tuple[list[TrackedPerson], np.ndarray]] = {}
+        # Per-camera uniform grid: cell -> ids of tracks whose bbox overlaps
+        # it, plus the cell range each track currently occupies
+        self._grid: defaultdict[str, dict[tuple[int, int], set[int]]] = defaultdict(dict)
+        self._grid_cells: defaultdict[str, dict[int, tuple[int, int, int, int]]] = (
+            defaultdict(dict)
+        )
+        # Per-camera last_seen array for stale scans: track_id -> slot, the
+        # track ids by slot and their last_seen. Updated in place on track
+        # updates, rebuilt lazily when tracks are added or removed
+        self._last_seen_index: dict[
+            str, tuple[dict[int, int], np.ndarray, np.ndarray]
+        ] = {}
+
+    def _grid_remove(self, camera_source: str, track_id: int) -> None:
+        """Drop a track from the spatial grid of its camera."""
+        cells = self._grid_cells[camera_source].pop(track_id, None)
+        if cells is None:
+            return
+        grid = self._grid[camera_source]
+        cx1, cy1, cx2, cy2 = cells
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                ids = grid.get((cx, cy))
+                if ids is not None:
+                    ids.discard(track_id)
+                    if not ids:
+                        del grid[(cx, cy)]
+
+    def _grid_update(self, camera_source: str, track_id: int, bbox: list[int]) -> None:
+        """Place a track in every grid cell its bbox overlaps."""
+        cells = (
+            int(bbox[0] // GRID_CELL_SIZE),
+            int(bbox[1] // GRID_CELL_SIZE),
+            int(bbox[2] // GRID_CELL_SIZE),
+            int(bbox[3] // GRID_CELL_SIZE),
+        )
+        if self._grid_cells[camera_source].get(track_id) == cells:
+            return
+
+        self._grid_remove(camera_source, track_id)
+        grid = self._grid[camera_source]
+        cx1, cy1, cx2, cy2 = cells
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                ids = grid.get((cx, cy))
+                if ids is None:
+                    grid[(cx, cy)] = {track_id}
+                else:
+                    ids.add(track_id)
+        self._grid_cells[camera_source][track_id] = cells
+
+    def _get_bbox_index(
+        self,
+        camera_source: str,
+    ) -> tuple[list[TrackedPerson], np.ndarray]:
+        """Get tracks with a real bbox and their bboxes as an (N, 4) array."""
+        index = self._bbox_index.get(camera_source)
+        if index is None:
+            tracks = [
+                t for t in self._tracks.get(camera_source, _EMPTY).values()
+                if t.has_bbox
+            ]
+            bboxes = np.array(
+                [t.bbox for t in tracks], dtype=np.float32
+            ).reshape(-1, 4)
+            index = (tracks, bboxes)
+            self._bbox_index[camera_source] = index
+        return index
+
+    def _get_last_seen_index(
+        self,
+        camera_source: str,
+    ) -> tuple[dict[int, int], np.ndarray, np.ndarray]:
+        """Get slot map, track ids and last_seen values as parallel arrays."""
+        index = self._last_seen_index.get(camera_source)
+        if index is None:
+            camera_tracks = self._tracks[camera_source]
+            n = len(camera_tracks)
+            slots = {track_id: i for i, track_id in enumerate(camera_tracks)}
+            track_ids = np.fromiter(camera_tracks.keys(), dtype=np.int64, count=n)
+            last_seen = np.fromiter(
+                (t.last_seen for t in camera_tracks.values()),
+                dtype=np.float64,
+                count=n,
+            )
+            index = (slots, track_ids, last_seen)
+            self._last_seen_index[camera_source] = index
+        return index
 
     def get_track(
         self,
@@ -72,30 +188,53 @@ class TrackManager:
         track_id: int,
     ) -> Optional[TrackedPerson]:
         """Get tracked person state."""
-        self._ensure_camera(camera_source)
-        return self._tracks[camera_source].get(track_id)
+        return self._tracks.get(camera_source, _EMPTY).get(track_id)
 
     def create_or_update_track(
         self,
         camera_source: str,
         track_id: int,
         bbox: list[int],
+        now: Optional[float] = None,
     ) -> TrackedPerson:
-        """Create or update track with new bbox."""
-        self._ensure_camera(camera_source)
+        """
+        Create or update track with new bbox.
+
+        Pass ``now`` to share one timestamp across all updates of a frame.
+        """
+        if now is None:
+            now = time.time()
+
+        self._bbox_index.pop(camera_source, None)
 
-        if track_id not in self._tracks[camera_source]:
-            self._tracks[camera_source][track_id] = TrackedPerson(
+        has_bbox = bbox != [0, 0, 0, 0]
+        camera_tracks = self._tracks[camera_source]
+        track = camera_tracks.get(track_id)
+        if track is None:
+            self._last_seen_index.pop(camera_source, None)
+            track = camera_tracks[track_id] = TrackedPerson(
                 track_id=track_id,
                 camera_source=camera_source,
                 bbox=bbox,
+                has_bbox=has_bbox,
+                first_seen=now,
+                last_seen=now,
             )
         else:
-            track = self._tracks[camera_source][track_id]
             track.bbox = bbox
-            track.last_seen = time.time()
+            track.has_bbox = has_bbox
+            track.last_seen = now
+            index = self._last_seen_index.get(camera_source)
+            if index is not None:
+                slots, _, last_seen = index
+                last_seen[slots[track_id]] = now
+
+        if has_bbox:
+            self._grid_update(camera_source, track_id, bbox)
+        else:
+            self._grid_remove(camera_source, track_id)
 
-        return self._tracks[camera_source][track_id]
+        return track
 
     def associate_person(
         self,
@@ -105,17 +244,23 @@ class TrackManager:
         person_name: str,
         is_known: bool,
         face_similarity: float,
+        now: Optional[float] = None,
     ) -> TrackedPerson:
         """Associate a track with a recognized person from face."""
+        if now is None:
+            now = time.time()
+
         track = self.get_track(camera_source, track_id)
         if not track:
-            track = self.create_or_update_track(camera_source, track_id, [0, 0, 0, 0])
+            track = self.create_or_update_track(
+                camera_source, track_id, [0, 0, 0, 0], now=now
+            )
 
         track.person_id = person_id
         track.person_name = person_name
         track.is_known = is_known
         track.face_similarity = face_similarity
-        track.last_face_match = time.time()
+        track.last_face_match = now
 
         # Update combined score
         if track.gait_similarity > 0:
@@ -132,14 +277,18 @@ class TrackManager:
         camera_source: str,
         track_id: int,
         gait_similarity: float,
+        now: Optional[float] = None,
     ) -> Optional[TrackedPerson]:
         """Update gait similarity for a track."""
         track = self.get_track(camera_source, track_id)
         if not track:
             return None
 
+        if now is None:
+            now = time.time()
+
         track.gait_similarity = gait_similarity
-        track.last_gait_match = time.time()
+        track.last_gait_match = now
 
         # Update combined score
         if track.face_similarity > 0:
@@ -191,26 +340,49 @@ class TrackManager:
         Returns:
             Best matching TrackedPerson or None
         """
-        from .gait import GaitRecognitionService
-
         if min_iou is None:
-            min_iou = self._config.iou_threshold
-
-        self._ensure_camera(camera_source)
-
-        best_track = None
-        best_iou = min_iou
-
-        for track in self._tracks[camera_source].values():
-            if track.bbox == [0, 0, 0, 0]:
-                continue
-
-            iou = GaitRecognitionService.compute_iou(track.bbox, pose_bbox)
-            if iou > best_iou:
-                best_iou = iou
-                best_track = track
+            min_iou = self._iou_threshold
+
+        camera_tracks = self._tracks.get(camera_source, _EMPTY)
+        if len(camera_tracks) < VECTORIZED_IOU_MIN_TRACKS:
+            px1, py1, px2, py2 = pose_bbox
+            best_track = None
+            best_iou = min_iou
+            for track in camera_tracks.values():
+                if not track.has_bbox:
+                    continue
+                # Quick reject: most tracks in a wide view don't overlap at all
+                tx1, ty1, tx2, ty2 = track.bbox
+                if tx2 <= px1 or tx1 >= px2 or ty2 <= py1 or ty1 >= py2:
+                    continue
+                iou = _iou_scalar(track.bbox, pose_bbox)
+                if iou > best_iou:
+                    best_iou = iou
+                    best_track = track
+            return best_track
+
+        tracks, bboxes = self._get_bbox_index(camera_source)
+        if not tracks:
+            return None
 
-        return best_track
+        px1, py1, px2, py2 = pose_bbox
+        iw = np.minimum(bboxes[:, 2], px2) - np.maximum(bboxes[:, 0], px1)
+        ih = np.minimum(bboxes[:, 3], py2) - np.maximum(bboxes[:, 1], py1)
+        intersection = iw.clip(min=0) * ih.clip(min=0)
+
+        areas = (bboxes[:, 2] - bboxes[:, 0]) * (bboxes[:, 3] - bboxes[:, 1])
+        union = areas + (px2 - px1) * (py2 - py1) - intersection
+        iou = np.divide(
+            intersection,
+            union,
+            out=np.zeros_like(intersection),
+            where=union > 0,
+        )
+
+        best = int(iou.argmax())
+        if iou[best] > min_iou:
+            return tracks[best]
+        return None
 
     def find_track_containing_bbox(
         self,
@@ -222,7 +394,9 @@ class TrackManager:
 
         Uses center point containment - checks if the center of inner_bbox
         is inside any track's bbox. This works better than IoU for faces
-        which are contained inside body bboxes.
+        which are contained inside body bboxes. Only tracks registered in
+        the grid cell holding the center are tested; if several contain
+        it, the oldest (lowest) track ID wins.
 
         Args:
             camera_source: Camera identifier
@@ -231,15 +405,21 @@ class TrackManager:
         Returns:
             Best matching TrackedPerson or None
         """
-        self._ensure_camera(camera_source)
-
         # Calculate center of inner bbox
         inner_cx = (inner_bbox[0] + inner_bbox[2]) / 2
         inner_cy = (inner_bbox[1] + inner_bbox[3]) / 2
 
-        for track in self._tracks[camera_source].values():
-            if track.bbox == [0, 0, 0, 0]:
-                continue
+        cell = (
+            int(inner_cx // GRID_CELL_SIZE),
+            int(inner_cy // GRID_CELL_SIZE),
+        )
+        candidates = self._grid.get(camera_source, _EMPTY).get(cell)
+        if not candidates:
+            return None
+
+        camera_tracks = self._tracks[camera_source]
+        for track_id in sorted(candidates):
+            track = camera_tracks[track_id]
 
             # Check if center is inside track bbox
             tx1, ty1, tx2, ty2 = track.bbox
@@ -251,10 +431,16 @@ class TrackManager:
     def get_active_tracks(
         self,
         camera_source: str,
+    ) -> ValuesView[TrackedPerson]:
+        """Get a live view of all active tracks for a camera."""
+        return self._tracks.get(camera_source, _EMPTY).values()
+
+    def get_active_tracks_list(
+        self,
+        camera_source: str,
     ) -> list[TrackedPerson]:
-        """Get all active tracks for a camera."""
-        self._ensure_camera(camera_source)
-        return list(self._tracks[camera_source].values())
+        """Get a snapshot list of all active tracks for a camera."""
+        return list(self.get_active_tracks(camera_source))
 
     def get_identified_tracks(
         self,
@@ -262,7 +448,7 @@ class TrackManager:
     ) -> list[TrackedPerson]:
         """Get tracks with identified persons."""
         return [
-            t for t in self.get_active_tracks(camera_source)
+            t for t in self._tracks.get(camera_source, _EMPTY).values()
             if t.person_id is not None
         ]
 
@@ -272,65 +458,83 @@ class TrackManager:
         track_id: int,
     ) -> None:
         """Remove a track."""
-        self._ensure_camera(camera_source)
-        self._tracks[camera_source].pop(track_id, None)
+        if self._tracks.get(camera_source, _EMPTY).pop(track_id, None) is not None:
+            self._grid_remove(camera_source, track_id)
+            self._last_seen_index.pop(camera_source, None)
+        self._bbox_index.pop(camera_source, None)
 
     def cleanup_stale_tracks(
         self,
         max_age: Optional[float] = None,
+        now: Optional[float] = None,
     ) -> int:
         """
         Remove tracks not seen recently.
 
         Args:
             max_age: Max seconds since last seen (default from config)
+            now: Current time.time() value (default: read the clock)
 
         Returns:
             Number of tracks removed
         """
         if max_age is None:
-            max_age = self._config.track_timeout
+            max_age = self._track_timeout
 
-        now = time.time()
+        if now is None:
+            now = time.time()
         removed = 0
-
-        for camera_source in list(self._tracks.keys()):
-            stale_ids = [
-                track_id
-                for track_id, track in self._tracks[camera_source].items()
-                if now - track.last_seen > max_age
-            ]
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+
+        for camera_source, camera_tracks in self._tracks.items():
+            if len(camera_tracks) >= VECTORIZED_CLEANUP_MIN_TRACKS:
+                _, track_ids, last_seen = self._get_last_seen_index(camera_source)
+                stale_ids = track_ids[(now - last_seen) > max_age].tolist()
+            else:
+                stale_ids = [
+                    track_id
+                    for track_id, track in camera_tracks.items()
+                    if now - track.last_seen > max_age
+                ]
+            if stale_ids:
+                self._bbox_index.pop(camera_source, None)
+                self._last_seen_index.pop(camera_source, None)
             for track_id in stale_ids:
-                self._tracks[camera_source].pop(track_id)
+                camera_tracks.pop(track_id)
+                self._grid_remove(camera_source, track_id)
                 removed += 1
-                logger.debug(
-                    "Removed stale track %d from %s",
-                    track_id,
-                    camera_source,
-                )
+                if debug_enabled:
+                    logger.debug(
+                        "Removed stale track %d from %s",
+                        track_id,
+                        camera_source,
+                    )
 
         return removed
 
     def get_track_summary(self, camera_source: str) -> dict:
         """Get summary of tracks for a camera."""
-        tracks = self.get_active_tracks(camera_source)
-        identified = [t for t in tracks if t.person_id]
-        with_gait = [t for t in identified if t.gait_similarity > 0]
+        camera_tracks = self._tracks.get(camera_source, _EMPTY)
+        with_gait = 0
+        persons = []
+        for t in camera_tracks.values():
+            if t.person_id is None:
+                continue
+            if t.gait_similarity > 0:
+                with_gait += 1
+            persons.append({
+                "track_id": t.track_id,
+                "name": t.person_name,
+                "face": t.face_similarity,
+                "gait": t.gait_similarity,
+                "combined": t.combined_similarity,
+            })
 
         return {
-            "total_tracks": len(tracks),
-            "identified": len(identified),
-            "with_gait": len(with_gait),
-            "persons": [
-                {
-                    "track_id": t.track_id,
-                    "name": t.person_name,
-                    "face": t.face_similarity,
-                    "gait": t.gait_similarity,
-                    "combined": t.combined_similarity,
-                }
-                for t in identified
-            ],
+            "total_tracks": len(camera_tracks),
+            "identified": len(persons),
+            "with_gait": with_gait,
+            "persons": persons,
         }
 
 
@@ -24,6 +24,12 @@ class DatabaseSettings(BaseSettings):
     max_pool_size: int = Field(default=10, description="Max pool connections")
     connect_timeout: float = Field(default=10.0, description="Connection timeout")
     command_timeout: float = Field(default=30.0, description="Command timeout")
+    statement_cache_size: int = Field(
+        default=1024, description="Prepared statements cached per connection"
+    )
+    max_cached_statement_lifetime: int = Field(
+        default=0, description="Seconds before a cached statement expires (0 = never)"
+    )
 
 
 db_settings = DatabaseSettings()
@@ -5,14 +5,42 @@ Uses asyncpg for async PostgreSQL access.
 """
 
 import logging
-from typing import Optional
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Optional
 
 import asyncpg
 
 from .config import db_settings
 
+try:
+    from pgvector.asyncpg import register_vector
+except ImportError:
+    register_vector = None
+
 logger = logging.getLogger("atlas.vision.storage.database")
 
+# Connection pinned to the current task by DatabasePool.session()
+_session_connection: ContextVar[Optional["VisionConnection"]] = ContextVar(
+    "atlas_vision_db_session", default=None
+)
+
+
+class VisionConnection(asyncpg.Connection):
+    """asyncpg connection that keeps explicitly prepared statements."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._prepared: dict[str, asyncpg.prepared_stmt.PreparedStatement] = {}
+
+    async def prepare_cached(self, query: str) -> asyncpg.prepared_stmt.PreparedStatement:
+        """Prepare query once per connection and reuse the statement."""
+        stmt = self._prepared.get(query)
+        if stmt is None:
+            stmt = await self.prepare(query)
+            self._prepared[query] = stmt
+        return stmt
+
 
 class DatabasePool:
     """Manages the asyncpg connection pool."""
@@ -26,6 +54,16 @@ class DatabasePool:
         """Check if the pool is initialized."""
         return self._initialized and self._pool is not None
 
+    @property
+    def has_vector_codec(self) -> bool:
+        """Whether vector columns use the pgvector binary codec (numpy in/out)."""
+        return register_vector is not None
+
+    async def _init_connection(self, conn: asyncpg.Connection) -> None:
+        """Per-connection setup run by the pool for each new connection."""
+        if register_vector is not None:
+            await register_vector(conn)
+
     async def initialize(self) -> None:
         """Initialize the connection pool."""
         if self._initialized:
@@ -52,6 +90,10 @@ class DatabasePool:
             max_size=db_settings.max_pool_size,
             timeout=db_settings.connect_timeout,
             command_timeout=db_settings.command_timeout,
+            statement_cache_size=db_settings.statement_cache_size,
+            max_cached_statement_lifetime=db_settings.max_cached_statement_lifetime,
+            init=self._init_connection,
+            connection_class=VisionConnection,
         )
         self._initialized = True
         logger.info("Database pool initialized")
@@ -64,23 +106,62 @@ class DatabasePool:
             self._initialized = False
             logger.info("Database pool closed")
 
-    async def fetchrow(self, query: str, *args):
-        """Execute query and fetch one row."""
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[VisionConnection]:
+        """Acquire a connection (the session's pinned one, if any)."""
+        conn = _session_connection.get()
+        if conn is not None:
+            yield conn
+            return
         if not self._pool:
             raise RuntimeError("Database not initialized")
-        return await self._pool.fetchrow(query, *args)
-
-    async def fetch(self, query: str, *args):
-        """Execute query and fetch all rows."""
+        async with self._pool.acquire() as conn:
+            yield conn
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[VisionConnection]:
+        """
+        Pin one pooled connection to the current task.
+
+        Every pool call made inside the block reuses it, skipping
+        acquire/release and keeping its prepared statements warm. The
+        connection serves one query at a time, so do not fan out
+        concurrent queries (e.g. asyncio.gather) inside a session.
+        """
+        async with self.acquire() as conn:
+            token = _session_connection.set(conn)
+            try:
+                yield conn
+            finally:
+                _session_connection.reset(token)
+
+    def _executor(self):
+        """Return the session's pinned connection, or the pool."""
+        conn = _session_connection.get()
+        if conn is not None:
+            return conn
         if not self._pool:
             raise RuntimeError("Database not initialized")
-        return await self._pool.fetch(query, *args)
+        return self._pool
+
+    # Query helpers return the executor's coroutine directly rather than
+    # awaiting it in a wrapper coroutine; callers still ``await`` them.
+
+    def fetchrow(self, query: str, *args) -> Awaitable[Optional[asyncpg.Record]]:
+        """Execute query and fetch one row."""
+        return self._executor().fetchrow(query, *args)
 
-    async def execute(self, query: str, *args):
+    def fetch(self, query: str, *args) -> Awaitable[list[asyncpg.Record]]:
+        """Execute query and fetch all rows."""
+        return self._executor().fetch(query, *args)
+
+    def fetchval(self, query: str, *args) -> Awaitable[Any]:
+        """Execute query and fetch the first column of the first row."""
+        return self._executor().fetchval(query, *args)
+
+    def execute(self, query: str, *args) -> Awaitable[str]:
         """Execute query without returning results."""
-        if not self._pool:
-            raise RuntimeError("Database not initialized")
-        return await self._pool.execute(query, *args)
+        return self._executor().execute(query, *args)
 
 
 # Global pool instance
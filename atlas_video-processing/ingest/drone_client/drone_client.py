@@ -1,7 +1,7 @@
 from kafka import KafkaProducer
 import time
 import random
-import json
+import msgpack
 
 KAFKA_BROKER = 'localhost:9092' # This will be the service name in docker-compose
 KAFKA_TOPIC = 'drone_video_stream'
@@ -17,7 +17,11 @@ def simulate_video_stream(drone_id):
         try:
             print(f"Drone {drone_id}: Attempting to connect to Kafka broker at {KAFKA_BROKER} (attempt {i+1}/{max_retries})...")
             producer = KafkaProducer(bootstrap_servers=[KAFKA_BROKER],
-                                     value_serializer=lambda v: json.dumps(v).encode('utf-8'),
+                                     value_serializer=msgpack.packb, # Binary payloads, no base64 needed for frames
+                                     linger_ms=50, # Let sends accumulate into batches
+                                     batch_size=65536,
+                                     compression_type='lz4',
+                                     acks=1,
                                      api_version=(0, 10, 1)) # Specify API version for compatibility
             print(f"Drone {drone_id}: Connected to Kafka broker at {KAFKA_BROKER}.")
             break
@@ -42,9 +46,8 @@ def simulate_video_stream(drone_id):
             
             print(f"Drone {drone_id}: Sending frame - {frame_data['message']} with data {frame_data['simulated_data']}")
             
-            # Send data to Kafka
+            # Send data to Kafka (delivered asynchronously in batches)
             producer.send(KAFKA_TOPIC, value=frame_data)
-            producer.flush() # Ensure message is sent
 
             time.sleep(random.uniform(0.5, 2.0)) # Simulate varying frame rates
     except KeyboardInterrupt:
@@ -53,6 +56,7 @@ def simulate_video_stream(drone_id):
         print(f"Drone {drone_id}: An error occurred: {e}")
     finally:
         if producer:
+            producer.flush(timeout=5) # Deliver anything still batched
             producer.close()
 
 if __name__ == "__main__":
@@ -1,5 +1,7 @@
 from kafka import KafkaConsumer
-import json
+from concurrent.futures import ProcessPoolExecutor
+import msgpack
+import os
 import time
 import cv2 # Import OpenCV
 
@@ -16,7 +18,7 @@ def process_frame_with_opencv(frame_data):
     # Simulate some CPU-bound work
     time.sleep(0.05) 
     # In a real application, you would decode the frame data here, e.g.:
-    # np_arr = np.frombuffer(base64.b64decode(frame_data['image_data']), np.uint8)
+    # np_arr = np.frombuffer(frame_data['image_data'], np.uint8)
     # img = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
     # gray_img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
     # ... then apply detection models
@@ -38,7 +40,7 @@ def process_video_stream():
                 auto_offset_reset='earliest', # Start reading at the earliest message
                 enable_auto_commit=True,
                 group_id='video-processor-group', # Consumer group ID
-                value_deserializer=lambda x: json.loads(x.decode('utf-8')),
+                value_deserializer=lambda x: msgpack.unpackb(x, raw=False),
                 api_version=(0, 10, 1) # Specify API version for compatibility
             )
             print(f"Video Processor: Connected to Kafka broker at {KAFKA_BROKER}. Listening to topic {KAFKA_TOPIC}...")
@@ -51,21 +53,36 @@ def process_video_stream():
         print(f"Video Processor: Failed to connect to Kafka after {max_retries} attempts. Exiting.")
         return
 
+    # CPU-bound frame work runs in worker processes so it isn't serialized by
+    # the GIL. (For pure cv2/numpy work, which releases the GIL, a
+    # ThreadPoolExecutor avoids the pickling cost instead.)
+    pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+
     try:
-        for message in consumer:
-            frame_data = message.value
-            print(f"Video Processor: Received frame from Drone {frame_data['drone_id']} at {frame_data['timestamp']} - simulated data: {frame_data['simulated_data']}")
-            
-            # Call the placeholder OpenCV processing function
-            processing_result = process_frame_with_opencv(frame_data)
-            
-            print(f"Video Processor: Processed frame from Drone {frame_data['drone_id']}. Result: {processing_result}")
+        while True:
+            # Pull frames in batches; once real models are wired in, a batch
+            # can be stacked and run through one inference call
+            batches = consumer.poll(timeout_ms=100, max_records=64)
+            for messages in batches.values():
+                pending = []
+                for message in messages:
+                    frame_data = message.value
+                    print(f"Video Processor: Received frame from Drone {frame_data['drone_id']} at {frame_data['timestamp']} - simulated data: {frame_data['simulated_data']}")
+
+                    # Call the placeholder OpenCV processing function
+                    pending.append((frame_data, pool.submit(process_frame_with_opencv, frame_data)))
+
+                # Wait for the batch before polling again so in-flight work stays bounded
+                for frame_data, future in pending:
+                    processing_result = future.result()
+                    print(f"Video Processor: Processed frame from Drone {frame_data['drone_id']}. Result: {processing_result}")
 
     except KeyboardInterrupt:
         print("Video Processor: Shutting down.")
     except Exception as e:
         print(f"Video Processor: An error occurred: {e}")
     finally:
+        pool.shutdown(wait=True)
         if consumer:
             consumer.close()
 
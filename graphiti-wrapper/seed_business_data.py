@@ -15,6 +15,7 @@ import asyncio
 import sys
 
 import httpx
+import orjson
 
 # ============================================================================
 # Business facts to seed -- EDIT THESE with real data
@@ -53,52 +54,64 @@ BUSINESS_FACTS = [
     "Invoices are sent on the 1st of every month by email.",
 ]
 
+# Facts with unfilled [...] placeholders are skipped; resolved once at import
+_FILTERED_FACTS: tuple[str, ...] = tuple(f for f in BUSINESS_FACTS if "[" not in f)
+
 GROUP_ID = "atlas-conversations"
 
 
 async def seed(base_url: str) -> None:
     """Post business facts as messages to the graphiti wrapper."""
-    # Health check first
-    async with httpx.AsyncClient(timeout=10) as client:
+    # One client for the health check and the seed POST so the connection is
+    # reused. No HTTP/2: httpx only negotiates it over TLS, and the wrapper
+    # is served over plain http.
+    async with httpx.AsyncClient(
+        timeout=300,
+        limits=httpx.Limits(max_connections=10),
+    ) as client:
+        # Health check first
         try:
-            resp = await client.get(f"{base_url}/healthcheck")
+            resp = await client.get(f"{base_url}/healthcheck", timeout=10)
             resp.raise_for_status()
-            print(f"Service healthy: {resp.json()}")
+            print(f"Service healthy: {orjson.loads(resp.content)}")
         except Exception as e:
             print(f"ERROR: Service not reachable at {base_url}/healthcheck -- {e}")
             sys.exit(1)
 
-    # Filter out placeholder facts
-    facts = [f for f in BUSINESS_FACTS if "[" not in f]
-    if not facts:
-        print(
-            "WARNING: All facts still contain placeholder brackets [...].\n"
-            "Edit BUSINESS_FACTS in this file with real data before running."
-        )
-        sys.exit(1)
-
-    # Build messages payload
-    messages = [
-        {
-            "content": fact,
-            "role_type": "system",
-            "role": None,
-            "source_description": "business-seed-data",
-        }
-        for fact in facts
-    ]
+        facts = _FILTERED_FACTS
+        if not facts:
+            print(
+                "WARNING: All facts still contain placeholder brackets [...].\n"
+                "Edit BUSINESS_FACTS in this file with real data before running."
+            )
+            sys.exit(1)
 
-    payload = {
-        "group_id": GROUP_ID,
-        "messages": messages,
-    }
+        # Build messages payload
+        messages = [
+            {
+                "content": fact,
+                "role_type": "system",
+                "role": None,
+                "source_description": "business-seed-data",
+            }
+            for fact in facts
+        ]
+
+        payload = {
+            "group_id": GROUP_ID,
+            "messages": messages,
+        }
 
-    print(f"Sending {len(messages)} business facts to {base_url}/messages ...")
+        print(f"Sending {len(messages)} business facts to {base_url}/messages ...")
 
-    async with httpx.AsyncClient(timeout=300) as client:
-        resp = await client.post(f"{base_url}/messages", json=payload)
+        # All facts go in a single request; the wrapper ingests them as one batch
+        resp = await client.post(
+            f"{base_url}/messages",
+            content=orjson.dumps(payload),
+            headers={"content-type": "application/json"},
+        )
         resp.raise_for_status()
-        result = resp.json()
+        result = orjson.loads(resp.content)
 
     print(f"Done: {result}")
 
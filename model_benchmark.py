@@ -1,11 +1,21 @@
 import time
+import numpy as np
+import orjson
 import requests
-import statistics
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 
 # Ollama API endpoint
 API_URL = "http://localhost:11434/api/chat"
 TAGS_URL = "http://localhost:11434/api/tags"
 
+# Requests in flight at once; Ollama queues anything beyond OLLAMA_NUM_PARALLEL
+MAX_CONCURRENCY = 4
+
+# Shared keep-alive session so runs reuse pooled connections to Ollama
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
 # Test prompts
 TEST_PROMPTS = [
     "Write a Python function to calculate fibonacci numbers recursively.",
@@ -13,56 +23,126 @@ TEST_PROMPTS = [
     "Write a simple HTTP server in Python using the http.server module.",
 ]
 
-def benchmark_model(model_name: str, num_runs: int = 3) -> dict:
-    """Benchmark a model's inference speed."""
-    times = []
-    tokens_per_sec = []
-    
+def _run_prompt(model_name: str, prompt: str) -> dict:
+    """Stream one chat request and time it.
+
+    Returns the HTTP status, total elapsed seconds, time to response
+    headers, time to first token (ttft) and Ollama's eval_count and
+    eval_duration from the final chunk, or an error snippet for non-200
+    responses. Timings use the monotonic perf_counter_ns clock.
+    """
+    start = time.perf_counter_ns()
+
+    with SESSION.post(API_URL, timeout=(5, 120), stream=True, json={
+        "model": model_name,
+        "messages": [{"role": "user", "content": prompt}],
+        "stream": True,
+        "options": {
+            "num_predict": 256,
+            "temperature": 0.7,
+        }
+    }) as response:
+        if response.status_code != 200:
+            return {"status": response.status_code, "error": response.text[:100]}
+
+        # requests measures send-to-headers itself
+        headers_time = response.elapsed.total_seconds()
+        ttft_ns = None
+        final = {}
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = orjson.loads(line)
+            if ttft_ns is None and chunk.get("message", {}).get("content"):
+                ttft_ns = time.perf_counter_ns() - start
+            if chunk.get("done"):
+                final = chunk
+
+    elapsed_ns = time.perf_counter_ns() - start
+    return {
+        "status": 200,
+        "elapsed": elapsed_ns / 1e9,
+        "headers_time": headers_time,
+        "ttft": (ttft_ns if ttft_ns is not None else elapsed_ns) / 1e9,
+        "eval_count": final.get("eval_count", 0),
+        "eval_duration": final.get("eval_duration", 0),  # in nanoseconds
+    }
+
+def benchmark_model(model_name: str, num_runs: int = 3, concurrency: int = MAX_CONCURRENCY) -> dict:
+    """Benchmark a model's inference speed.
+
+    Prompt runs are issued concurrently (up to ``concurrency`` at once) and
+    each request is timed on its own, so wall-clock for the whole benchmark
+    shrinks while per-request latency is still reported. Responses are
+    streamed to measure time to first token; tok/s is decode-only, from
+    Ollama's eval counters.
+    """
     print(f"\n{'='*50}")
     print(f"Benchmarking: {model_name}")
     print(f"{'='*50}")
     
-    for i, prompt in enumerate(TEST_PROMPTS):
-        for run in range(num_runs):
-            start = time.time()
-            
-            response = requests.post(API_URL, json={
-                "model": model_name,
-                "messages": [{"role": "user", "content": prompt}],
-                "stream": False,
-                "options": {
-                    "num_predict": 256,
-                    "temperature": 0.7,
-                }
-            })
-            
-            elapsed = time.time() - start
+    jobs = [
+        (i, run, prompt)
+        for i, prompt in enumerate(TEST_PROMPTS)
+        for run in range(num_runs)
+    ]
+    times = np.empty(len(jobs), dtype=np.float64)
+    ttfts = np.empty(len(jobs), dtype=np.float64)
+    tokens_per_sec = np.empty(len(jobs), dtype=np.float64)
+    ok = 0
+    
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(_run_prompt, model_name, prompt) for _, _, prompt in jobs]
+
+        for (i, run, _), future in zip(jobs, futures):
+            result = future.result()
             
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Ollama provides eval_count and eval_duration
-                eval_count = data.get("eval_count", 0)
-                eval_duration = data.get("eval_duration", 0)  # in nanoseconds
+            if result["status"] == 200:
+                elapsed = result["elapsed"]
+                ttft = result["ttft"]
+                eval_count = result["eval_count"]
+                eval_duration = result["eval_duration"]
                 
                 if eval_duration > 0:
                     tps = eval_count / (eval_duration / 1e9)  # convert ns to seconds
                 else:
                     tps = 0
                 
-                times.append(elapsed)
-                tokens_per_sec.append(tps)
+                times[ok] = elapsed
+                ttfts[ok] = ttft
+                tokens_per_sec[ok] = tps
+                ok += 1
                 
-                print(f"  Prompt {i+1}, Run {run+1}: {elapsed:.2f}s, {tps:.1f} tok/s ({eval_count} tokens)")
+                print(
+                    f"  Prompt {i+1}, Run {run+1}: {elapsed:.2f}s, "
+                    f"headers {result['headers_time']*1000:.0f}ms, TTFT {ttft*1000:.0f}ms, "
+                    f"{tps:.1f} tok/s ({eval_count} tokens)"
+                )
             else:
-                print(f"  ERROR: {response.status_code} - {response.text[:100]}")
+                print(f"  ERROR: {result['status']} - {result['error']}")
+    
+    if not ok:
+        return {
+            "model": model_name,
+            "avg_time": 0, "p50_time": 0, "p95_time": 0,
+            "avg_ttft": 0, "p50_ttft": 0, "p95_ttft": 0,
+            "avg_tps": 0, "min_time": 0, "max_time": 0,
+        }
     
+    times, ttfts, tokens_per_sec = times[:ok], ttfts[:ok], tokens_per_sec[:ok]
+    p50_time, p95_time = np.percentile(times, [50, 95]).tolist()
+    p50_ttft, p95_ttft = np.percentile(ttfts, [50, 95]).tolist()
     return {
         "model": model_name,
-        "avg_time": statistics.mean(times) if times else 0,
-        "avg_tps": statistics.mean(tokens_per_sec) if tokens_per_sec else 0,
-        "min_time": min(times) if times else 0,
-        "max_time": max(times) if times else 0,
+        "avg_time": float(times.mean()),
+        "p50_time": p50_time,
+        "p95_time": p95_time,
+        "avg_ttft": float(ttfts.mean()),
+        "p50_ttft": p50_ttft,
+        "p95_ttft": p95_ttft,
+        "avg_tps": float(tokens_per_sec.mean()),
+        "min_time": float(times.min()),
+        "max_time": float(times.max()),
     }
 
 def main():
@@ -72,7 +152,7 @@ def main():
     
     # Get available models from Ollama
     try:
-        models_resp = requests.get(TAGS_URL)
+        models_resp = SESSION.get(TAGS_URL, timeout=(5, 30))
         if models_resp.status_code == 200:
             models_data = models_resp.json().get("models", [])
             available = [m["name"] for m in models_data]
@@ -114,11 +194,14 @@ def main():
     print("\n" + "="*60)
     print("BENCHMARK RESULTS SUMMARY")
     print("="*60)
-    print(f"{'Model':<50} {'Avg Time':>10} {'Avg TPS':>10}")
-    print("-"*70)
+    print(f"{'Model':<50} {'Avg Time':>10} {'p95 Time':>10} {'Avg TTFT':>10} {'p95 TTFT':>10} {'Avg TPS':>10}")
+    print("-"*104)
     
     for r in sorted(results, key=lambda x: x["avg_tps"], reverse=True):
-        print(f"{r['model']:<50} {r['avg_time']:>9.2f}s {r['avg_tps']:>9.1f}")
+        print(
+            f"{r['model']:<50} {r['avg_time']:>9.2f}s {r['p95_time']:>9.2f}s "
+            f"{r['avg_ttft']*1000:>8.0f}ms {r['p95_ttft']*1000:>8.0f}ms {r['avg_tps']:>9.1f}"
+        )
     
     if len(results) >= 2:
         fastest = max(results, key=lambda x: x["avg_tps"])
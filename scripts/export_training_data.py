@@ -9,45 +9,39 @@ Formats conversations into standard training formats:
 """
 
 import asyncio
-import json
 import logging
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Optional
 from uuid import UUID
 
+import orjson
+
 from atlas_brain.storage.database import init_database
 from atlas_brain.storage.repositories.conversation import get_conversation_repo
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Write buffer for training-data exports
+EXPORT_BUFFER_SIZE = 1 << 20
 
-async def export_conversations_for_training(
-    output_dir: Path = Path("data/training"),
+SYSTEM_PROMPT = "You are Atlas, a helpful AI assistant."
+
+
+async def stream_training_examples(
+    repo,
     min_turns: int = 4,
     turn_type: str = "conversation",
-    format: str = "jsonl",
-) -> None:
+) -> AsyncIterator[dict]:
     """
-    Export conversations in training format.
+    Yield training examples one at a time from the conversation repo.
     
-    Args:
-        output_dir: Directory to save training data
-        min_turns: Minimum conversation length
-        turn_type: Filter by turn type ("conversation" or "command")
-        format: Output format ("jsonl", "chat", or "alpaca")
-    """
-    output_dir.mkdir(parents=True, exist_ok=True)
-    repo = get_conversation_repo()
+    Sessions are fetched one at a time, so export memory stays flat as
+    history grows; only the session ID list is held up front.
     
-    # Get all sessions (you'd need to add this query)
-    # For now, showing the structure
-    
-    training_examples = []
-    
-    # Example format - adjust based on your needs
-    example = {
+    Example format - adjust based on your needs:
+    {
         "messages": [
             {"role": "system", "content": "You are Atlas, a helpful AI assistant."},
             {"role": "user", "content": "User message here"},
@@ -60,16 +54,55 @@ async def export_conversations_for_training(
             "quality_score": 0.85  # Add your own quality metrics
         }
     }
+    """
+    session_ids = await repo.get_session_ids(turn_type=turn_type, min_turns=min_turns)
+    for session_id in session_ids:
+        turns = await repo.get_history(session_id, limit=1000, turn_type=turn_type)
+        if len(turns) < min_turns:
+            continue
+        
+        speaker_id = next((t.speaker_id for t in turns if t.speaker_id), None)
+        yield {
+            "messages": [{"role": "system", "content": SYSTEM_PROMPT}]
+            + [{"role": t.role, "content": t.content} for t in turns],
+            "metadata": {
+                "session_id": str(session_id),
+                "timestamp": turns[0].created_at.date().isoformat(),
+                "speaker_id": speaker_id,
+            },
+        }
+
+
+async def export_conversations_for_training(
+    output_dir: Path = Path("data/training"),
+    min_turns: int = 4,
+    turn_type: str = "conversation",
+    format: str = "jsonl",
+) -> None:
+    """
+    Export conversations in training format.
+    
+    Args:
+        output_dir: Directory to save training data
+        min_turns: Minimum conversation length
+        turn_type: Filter by turn type ("conversation" or "command")
+        format: Output format ("jsonl", "chat", or "alpaca")
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    await init_database()
+    repo = get_conversation_repo()
     
     # Write to file
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     output_file = output_dir / f"training_data_{timestamp}.jsonl"
     
-    with open(output_file, "w") as f:
-        for example in training_examples:
-            f.write(json.dumps(example) + "\n")
+    exported = 0
+    with open(output_file, "wb", buffering=EXPORT_BUFFER_SIZE) as f:
+        async for example in stream_training_examples(repo, min_turns, turn_type):
+            f.write(orjson.dumps(example, option=orjson.OPT_APPEND_NEWLINE))
+            exported += 1
     
-    logger.info(f"Exported {len(training_examples)} conversations to {output_file}")
+    logger.info(f"Exported {exported} conversations to {output_file}")
 
 
 async def filter_quality_conversations(
@@ -118,4 +151,12 @@ async def create_synthetic_variations(
 
 
 if __name__ == "__main__":
+    # uvloop (installed with uvicorn[standard]) schedules tasks and socket
+    # I/O faster than the default loop; it is unavailable on Windows
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    
     asyncio.run(export_conversations_for_training())
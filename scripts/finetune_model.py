@@ -46,19 +46,42 @@ def finetune_with_lora(
         batch_size: Batch size
     """
     try:
-        from transformers import AutoModelForCausalLM, AutoTokenizer, TrainingArguments
+        import torch
+        from transformers import (
+            AutoModelForCausalLM,
+            AutoTokenizer,
+            BitsAndBytesConfig,
+            TrainingArguments,
+        )
         from peft import LoraConfig, get_peft_model, prepare_model_for_kbit_training
         from trl import SFTTrainer
         from datasets import load_dataset
     except ImportError:
-        logger.error("Install required packages: pip install transformers peft trl datasets")
+        logger.error(
+            "Install required packages: pip install transformers peft trl datasets bitsandbytes"
+        )
         return
     
     logger.info(f"Loading base model: {base_model}")
     
+    # bf16 needs Ampere or newer; older GPUs fall back to fp16
+    use_bf16 = torch.cuda.is_available() and torch.cuda.is_bf16_supported()
+    compute_dtype = torch.bfloat16 if use_bf16 else torch.float16
+    logger.info(f"Compute dtype: {compute_dtype}")
+    
+    # Load base weights quantized to 4-bit NF4 (QLoRA); only the LoRA
+    # adapters are trained in higher precision
+    bnb_config = BitsAndBytesConfig(
+        load_in_4bit=True,
+        bnb_4bit_quant_type="nf4",
+        bnb_4bit_compute_dtype=compute_dtype,
+        bnb_4bit_use_double_quant=True,
+    )
+    
     # Load model and tokenizer
     model = AutoModelForCausalLM.from_pretrained(
         base_model,
+        quantization_config=bnb_config,
         device_map="auto",
         trust_remote_code=True,
     )
@@ -74,8 +97,8 @@ def finetune_with_lora(
         task_type="CAUSAL_LM",
     )
     
-    # Prepare model for LoRA training
-    model = prepare_model_for_kbit_training(model)
+    # Prepare quantized model for LoRA training
+    model = prepare_model_for_kbit_training(model, use_gradient_checkpointing=True)
     model = get_peft_model(model, lora_config)
     
     logger.info(f"Trainable parameters: {model.print_trainable_parameters()}")
@@ -92,7 +115,10 @@ def finetune_with_lora(
         logging_steps=10,
         save_strategy="epoch",
         warmup_steps=100,
-        fp16=True,  # Use mixed precision
+        bf16=use_bf16,  # Matches the 4-bit compute dtype
+        fp16=not use_bf16,
+        gradient_checkpointing=True,
+        optim="paged_adamw_8bit",
     )
     
     # Start training
@@ -143,14 +169,22 @@ def evaluate_finetuned_model(
     model = PeftModel.from_pretrained(base, adapter_path)
     model.eval()
     
+    # Tokenize all prompts once and generate them as one padded batch.
+    # Decoder-only models need left padding so generation continues each prompt.
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    tokenizer.padding_side = "left"
+    inputs = tokenizer(test_prompts, return_tensors="pt", padding=True).to(model.device)
+    outputs = model.generate(
+        **inputs,
+        max_new_tokens=100,
+        pad_token_id=tokenizer.pad_token_id,
+    )
+    responses = tokenizer.batch_decode(outputs, skip_special_tokens=True)
+    
     logger.info("=== Evaluation Results ===")
     
-    for i, prompt in enumerate(test_prompts, 1):
-        # Generate with fine-tuned model
-        inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
-        outputs = model.generate(**inputs, max_new_tokens=100)
-        response = tokenizer.decode(outputs[0], skip_special_tokens=True)
-        
+    for i, (prompt, response) in enumerate(zip(test_prompts, responses), 1):
         logger.info(f"\nTest {i}")
         logger.info(f"Prompt: {prompt}")
         logger.info(f"Response: {response}")
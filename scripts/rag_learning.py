@@ -14,37 +14,147 @@ Benefits:
 
 import asyncio
 import logging
+import os
+import re
+import sqlite3
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
 from uuid import UUID
 
-from atlas_brain.services.embedding.sentence_transformer import SentenceTransformerEmbedding
+import numpy as np
+import orjson
+
+from atlas_brain.services.embedding.sentence_transformer import (
+    SentenceTransformerEmbedding,
+    get_embedding_service,
+)
 from atlas_brain.storage.database import init_database
 from atlas_brain.storage.repositories.conversation import get_conversation_repo
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Rows upcast to float32 per block when scoring the float16 embedding store
+SCORE_BLOCK_ROWS = 4096
+
+# Patterns embedded per model call when adding in bulk
+EMBED_BATCH_SIZE = 64
+
+# Two-stage (IVF) search for large stores: k-means the embeddings into
+# ~sqrt(N) clusters, then score only rows in the IVF_NPROBE clusters whose
+# centroids are closest to the query. Smaller stores are scanned in full.
+IVF_MIN_PATTERNS = 4096
+IVF_NPROBE = 8
+IVF_KMEANS_ITERS = 10
+
+# Phrases that mark an assistant turn as a failed or apologetic response
+ERROR_PHRASES_RE = re.compile(r"sorry|can't|unable|error|failed", re.IGNORECASE)
+
 
 class ConversationPatternStore:
     """
     Store and retrieve successful conversation patterns.
     
     Uses embeddings to find similar past interactions.
+    
+    Persisted as two files: storage_path, a memory-mapped float16 .npy
+    matrix with one embedding row per pattern (plus spare capacity), and
+    a SQLite sidecar ("<stem>.sqlite3") whose patterns table holds the
+    metadata, keyed by row index. Only the metadata of returned matches
+    is read, so startup cost does not grow with the number of patterns.
     """
     
     def __init__(
         self,
         embedding_service: Optional[SentenceTransformerEmbedding] = None,
-        storage_path: Path = Path("data/conversation_patterns.json"),
+        storage_path: Path = Path("data/conversation_patterns.npy"),
     ):
-        self.embedding = embedding_service or SentenceTransformerEmbedding()
+        # Default to the process-wide model so stores share one copy of the weights
+        self.embedding = embedding_service or get_embedding_service()
         self.storage_path = storage_path
-        self.patterns = []  # In-memory cache
+        self.meta_path = storage_path.with_suffix(".sqlite3")
         
         if not self.embedding.is_loaded:
             self.embedding.load()
+        
+        # Unit-norm float16 embeddings, row i belongs to pattern id i.
+        # Capacity grows by doubling; only the first _count rows are live.
+        self._embeddings = np.empty((0, self.embedding.dimension), dtype=np.float16)
+        
+        # IVF index over the first _ivf_size rows; rows added later are
+        # scanned directly until the store doubles and the index is rebuilt
+        self._ivf_centroids: Optional[np.ndarray] = None
+        self._ivf_lists: list[np.ndarray] = []
+        self._ivf_size = 0
+        
+        self._load()
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def _load(self) -> None:
+        """Open the metadata DB and map the stored embedding matrix, if present."""
+        self.meta_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.meta_path)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS patterns (
+                id INTEGER PRIMARY KEY,
+                user_message TEXT NOT NULL,
+                assistant_response TEXT NOT NULL,
+                quality_score REAL NOT NULL,
+                metadata TEXT NOT NULL,
+                added_at TEXT NOT NULL
+            )
+            """
+        )
+        self._count = self._db.execute(
+            "SELECT COALESCE(MAX(id) + 1, 0) FROM patterns"
+        ).fetchone()[0]
+        
+        if self.storage_path.exists():
+            self._embeddings = np.load(self.storage_path, mmap_mode="r+")
+            logger.info(f"Loaded {self._count} patterns from {self.storage_path}")
+    
+    def _save_patterns(self, patterns: list[dict]) -> None:
+        """Flush new embedding rows, then commit metadata rows for patterns."""
+        if isinstance(self._embeddings, np.memmap):
+            self._embeddings.flush()
+        with self._db:
+            self._db.executemany(
+                "INSERT INTO patterns VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        self._count + i,
+                        p["user_message"],
+                        p["assistant_response"],
+                        p["quality_score"],
+                        orjson.dumps(p["metadata"]).decode(),
+                        p["added_at"],
+                    )
+                    for i, p in enumerate(patterns)
+                ],
+            )
+        self._count += len(patterns)
+    
+    def _fetch_patterns(self, ids: list[int]) -> dict[int, dict]:
+        """Read metadata for the given pattern ids."""
+        rows = self._db.execute(
+            "SELECT id, user_message, assistant_response, quality_score, metadata, added_at "
+            f"FROM patterns WHERE id IN ({','.join('?' * len(ids))})",
+            ids,
+        ).fetchall()
+        return {
+            row[0]: {
+                "user_message": row[1],
+                "assistant_response": row[2],
+                "quality_score": row[3],
+                "metadata": orjson.loads(row[4]),
+                "added_at": row[5],
+            }
+            for row in rows
+        }
     
     async def add_pattern(
         self,
@@ -69,14 +179,148 @@ class ConversationPatternStore:
             "user_message": user_message,
             "assistant_response": assistant_response,
             "quality_score": quality_score,
-            "embedding": embedding.tolist(),
             "metadata": metadata or {},
             "added_at": datetime.now().isoformat(),
         }
         
-        self.patterns.append(pattern)
+        self._append_embeddings(embedding[np.newaxis])
+        self._save_patterns([pattern])
         logger.info(f"Added pattern: {user_message[:50]}...")
     
+    async def add_patterns_bulk(
+        self,
+        items: list[tuple[str, str, float, Optional[dict]]],
+    ) -> None:
+        """
+        Add many patterns, embedding their user messages in batched calls.
+        
+        Args:
+            items: (user_message, assistant_response, quality_score, metadata)
+                tuples, as for add_pattern
+        """
+        if not items:
+            return
+        
+        embeddings = self.embedding.embed_batch(
+            [item[0] for item in items], batch_size=EMBED_BATCH_SIZE
+        )
+        self._append_embeddings(embeddings)
+        
+        added_at = datetime.now().isoformat()
+        patterns = [
+            {
+                "user_message": user_message,
+                "assistant_response": assistant_response,
+                "quality_score": quality_score,
+                "metadata": metadata or {},
+                "added_at": added_at,
+            }
+            for user_message, assistant_response, quality_score, metadata in items
+        ]
+        self._save_patterns(patterns)
+        logger.info(f"Added {len(items)} patterns")
+    
+    def _append_embeddings(self, embeddings: np.ndarray) -> None:
+        """Store unit-norm float16 copies of embedding rows after the last pattern."""
+        start = self._count
+        stop = start + len(embeddings)
+        if stop > len(self._embeddings):
+            self._grow_storage(max(2 * len(self._embeddings), stop, 64))
+        
+        rows = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(rows, axis=1, keepdims=True)
+        np.divide(rows, norms, out=rows, where=norms > 0)
+        self._embeddings[start:stop] = rows
+    
+    def _grow_storage(self, capacity: int) -> None:
+        """Move embeddings into a larger memory-mapped .npy file."""
+        self.storage_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.storage_path.with_name(f"{self.storage_path.name}.tmp")
+        grown = np.lib.format.open_memmap(
+            tmp_path,
+            mode="w+",
+            dtype=np.float16,
+            shape=(capacity, self._embeddings.shape[1]),
+        )
+        live = self._count
+        grown[:live] = self._embeddings[:live]
+        grown.flush()
+        os.replace(tmp_path, self.storage_path)
+        self._embeddings = grown
+    
+    def _similarities(
+        self,
+        query_embedding: np.ndarray,
+        rows: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Cosine similarity of a unit-norm float32 query to rows (default: all)."""
+        n = self._count if rows is None else len(rows)
+        similarities = np.empty(n, dtype=np.float32)
+        # NumPy has no BLAS path for float16, so upcast a block at a time
+        for start in range(0, n, SCORE_BLOCK_ROWS):
+            stop = min(start + SCORE_BLOCK_ROWS, n)
+            if rows is None:
+                block = self._embeddings[start:stop]
+            else:
+                block = self._embeddings[rows[start:stop]]
+            np.matmul(block.astype(np.float32), query_embedding, out=similarities[start:stop])
+        return similarities
+    
+    def _assign_clusters(self, centroids: np.ndarray, n: int) -> np.ndarray:
+        """Label each of the first n rows with its most similar centroid."""
+        labels = np.empty(n, dtype=np.intp)
+        for start in range(0, n, SCORE_BLOCK_ROWS):
+            stop = min(start + SCORE_BLOCK_ROWS, n)
+            block = self._embeddings[start:stop].astype(np.float32)
+            labels[start:stop] = (block @ centroids.T).argmax(axis=1)
+        return labels
+    
+    def _build_ivf(self) -> None:
+        """Spherical k-means over all current rows into ~sqrt(N) inverted lists."""
+        n = self._count
+        k = max(1, int(np.sqrt(n)))
+        rng = np.random.default_rng(0)
+        centroids = self._embeddings[np.sort(rng.choice(n, k, replace=False))].astype(np.float32)
+        
+        for _ in range(IVF_KMEANS_ITERS):
+            labels = self._assign_clusters(centroids, n)
+            order = np.argsort(labels, kind="stable")
+            counts = np.bincount(labels, minlength=k)
+            nonempty = counts > 0
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            # Sum rows per cluster (rows grouped by label); empty clusters keep
+            # their previous centroid
+            centroids[nonempty] = np.add.reduceat(
+                self._embeddings[order].astype(np.float32), starts[nonempty], axis=0
+            )
+            centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+        
+        labels = self._assign_clusters(centroids, n)
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=k)
+        self._ivf_centroids = centroids
+        self._ivf_lists = np.split(order, np.cumsum(counts)[:-1])
+        self._ivf_size = n
+        logger.info(f"Built IVF index: {k} clusters over {n} patterns")
+    
+    def _candidate_rows(self, query_embedding: np.ndarray) -> Optional[np.ndarray]:
+        """Rows worth scoring for the query, or None to scan every row."""
+        n = self._count
+        if n < IVF_MIN_PATTERNS:
+            return None
+        if self._ivf_centroids is None or n >= 2 * self._ivf_size:
+            self._build_ivf()
+        
+        centroid_sims = self._ivf_centroids @ query_embedding
+        nprobe = min(IVF_NPROBE, len(centroid_sims))
+        probe = np.argpartition(-centroid_sims, nprobe - 1)[:nprobe]
+        rows = np.concatenate(
+            [self._ivf_lists[c] for c in probe] + [np.arange(self._ivf_size, n)]
+        )
+        # Sorted rows keep reads from the memory-mapped matrix sequential
+        rows.sort()
+        return rows
+    
     def find_similar_patterns(
         self,
         query: str,
@@ -94,32 +338,39 @@ class ConversationPatternStore:
         Returns:
             List of similar patterns with similarity scores
         """
-        import numpy as np
-        from numpy.linalg import norm
+        if not self._count:
+            return []
         
         # Embed query
-        query_embedding = self.embedding.embed(query)
-        
-        # Calculate similarities
-        results = []
-        for pattern in self.patterns:
-            pattern_embedding = np.array(pattern["embedding"])
-            
-            # Cosine similarity
-            similarity = np.dot(query_embedding, pattern_embedding) / (
-                norm(query_embedding) * norm(pattern_embedding)
-            )
-            
-            if similarity >= min_similarity:
-                results.append({
-                    "pattern": pattern,
-                    "similarity": float(similarity),
-                })
+        query_embedding = self.embedding.embed(query).astype(np.float32)
+        query_norm = np.linalg.norm(query_embedding)
+        if query_norm == 0:
+            return []
+        query_embedding /= query_norm
+        
+        # Cosine similarity against candidate rows (every row for small stores)
+        rows = self._candidate_rows(query_embedding)
+        similarities = self._similarities(query_embedding, rows)
         
-        # Sort by similarity
-        results.sort(key=lambda x: x["similarity"], reverse=True)
+        # Select the top_k in O(N), then sort only those and apply threshold
+        k = min(top_k, similarities.size)
+        if k <= 0:
+            return []
+        idx = np.argpartition(-similarities, k - 1)[:k]
+        idx = idx[np.argsort(-similarities[idx])]
+        idx = idx[similarities[idx] >= min_similarity]
+        pattern_idx = (idx if rows is None else rows[idx]).tolist()
+        if not pattern_idx:
+            return []
+        patterns = self._fetch_patterns(pattern_idx)
         
-        return results[:top_k]
+        return [
+            {
+                "pattern": patterns[p],
+                "similarity": float(similarities[i]),
+            }
+            for i, p in zip(idx, pattern_idx)
+        ]
     
     def build_context_from_patterns(
         self,
@@ -131,25 +382,30 @@ class ConversationPatternStore:
         
         This gets injected into the prompt as examples.
         """
+        if top_k <= 0:
+            return ""
+        
         similar = self.find_similar_patterns(query, top_k=top_k)
         
         if not similar:
             return ""
         
-        context = "Here are similar past conversations:\n\n"
+        parts = ["Here are similar past conversations:\n\n"]
         
         for i, result in enumerate(similar, 1):
             pattern = result["pattern"]
-            context += f"Example {i} (similarity: {result['similarity']:.2f}):\n"
-            context += f"User: {pattern['user_message']}\n"
-            context += f"Assistant: {pattern['assistant_response']}\n\n"
+            parts.append(
+                f"Example {i} (similarity: {result['similarity']:.2f}):\n"
+                f"User: {pattern['user_message']}\n"
+                f"Assistant: {pattern['assistant_response']}\n\n"
+            )
         
-        return context
+        return "".join(parts)
 
 
 async def build_pattern_database_from_conversations(
     min_quality_score: float = 0.8,
-    output_path: Path = Path("data/conversation_patterns.db"),
+    output_path: Path = Path("data/conversation_patterns.npy"),
 ) -> None:
     """
     Build RAG database from existing conversations.
@@ -157,7 +413,7 @@ async def build_pattern_database_from_conversations(
     Extracts high-quality patterns from conversation history.
     """
     repo = get_conversation_repo()
-    pattern_store = ConversationPatternStore()
+    pattern_store = ConversationPatternStore(storage_path=output_path)
     
     # Get all conversations
     # You'd need to implement session iteration
@@ -165,7 +421,8 @@ async def build_pattern_database_from_conversations(
     
     logger.info("Building pattern database...")
     
-    # Example: Process conversations
+    # Example: Process conversations, embedding accepted pairs in batches
+    # pending = []
     # sessions = await repo.get_all_sessions()
     # for session in sessions:
     #     turns = await repo.get_history(session.id, limit=1000)
@@ -180,17 +437,21 @@ async def build_pattern_database_from_conversations(
     #             quality = calculate_quality_score(turns[i], turns[i+1])
     #             
     #             if quality >= min_quality_score:
-    #                 await pattern_store.add_pattern(
-    #                     user_message=turns[i].content,
-    #                     assistant_response=turns[i+1].content,
-    #                     quality_score=quality,
-    #                     metadata={
+    #                 pending.append((
+    #                     turns[i].content,
+    #                     turns[i+1].content,
+    #                     quality,
+    #                     {
     #                         "intent": turns[i].intent,
     #                         "speaker_id": turns[i].speaker_id,
-    #                     }
-    #                 )
+    #                     },
+    #                 ))
+    #                 if len(pending) >= EMBED_BATCH_SIZE:
+    #                     await pattern_store.add_patterns_bulk(pending)
+    #                     pending = []
+    # await pattern_store.add_patterns_bulk(pending)
     
-    logger.info(f"Pattern database built with {len(pattern_store.patterns)} patterns")
+    logger.info(f"Pattern database built with {len(pattern_store)} patterns")
 
 
 def calculate_quality_score(user_turn: dict, assistant_turn: dict) -> float:
@@ -212,8 +473,7 @@ def calculate_quality_score(user_turn: dict, assistant_turn: dict) -> float:
         score *= 0.5
     
     # Error indicators
-    error_phrases = ["sorry", "can't", "unable", "error", "failed"]
-    if any(phrase in response.lower() for phrase in error_phrases):
+    if ERROR_PHRASES_RE.search(response):
         score *= 0.7
     
     # Intent success
@@ -247,5 +507,13 @@ Use these examples to inform your response, but adapt to the current context.
 
 
 if __name__ == "__main__":
+    # uvloop (installed with uvicorn[standard]) schedules tasks and socket
+    # I/O faster than the default loop; it is unavailable on Windows
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    
     # Build pattern database
     asyncio.run(build_pattern_database_from_conversations())
@@ -12,25 +12,161 @@ Decoder runs on CPU (less critical for latency).
 
 Usage:
     python convert_whisper_to_rknn.py --model tiny --language en
+    python convert_whisper_to_rknn.py --model tiny --calibration-audio data/calib_audio
 
 Requirements:
-    pip install rknn-toolkit2 openai-whisper onnx torch
+    pip install rknn-toolkit2 openai-whisper onnx onnxsim torch
 """
 
 import argparse
-import os
+import functools
+import gc
+import io
+import json
 import sys
+import tempfile
 from pathlib import Path
 
 import numpy as np
 import torch
 
+N_MELS = 80
+N_FRAMES = 3000
 
-def export_whisper_encoder_to_onnx(
-    model_size: str = 'tiny',
-    output_dir: str = 'models/whisper_onnx'
-):
-    """Export Whisper encoder to ONNX format."""
+
+class NormalizedInputEncoder(torch.nn.Module):
+    """
+    Encoder that takes (mel - mean) / std and undoes it before encoding.
+
+    RKNN applies mean_values/std_values to the raw input at runtime, so
+    with this wrapper the INT8 input tensor is quantized over a
+    normalized range while the encoder still sees real log-mels. The
+    scale and shift fold into the first convolution.
+    """
+
+    def __init__(self, encoder, mean: float, std: float):
+        super().__init__()
+        self.encoder = encoder
+        self.mean = mean
+        self.std = std
+
+    def forward(self, mel):
+        return self.encoder(mel * self.std + self.mean)
+
+
+def simplify_onnx(model_bytes: bytes) -> bytes:
+    """
+    Validate, shape-infer and simplify a serialized ONNX encoder.
+
+    The input shape is pinned to (1, 80, 3000) so constant folding can
+    remove the Shape/Gather/Concat chains around each reshape.
+    """
+    try:
+        import onnx
+        import onnxsim
+    except ImportError:
+        print("WARNING: onnx/onnxsim not installed, skipping simplification")
+        print("  Run: pip install onnx onnxsim")
+        return model_bytes
+
+    print("Simplifying ONNX graph...")
+    model = onnx.load_from_string(model_bytes)
+    onnx.checker.check_model(model)
+    model = onnx.shape_inference.infer_shapes(model)
+    model_simp, ok = onnxsim.simplify(
+        model, overwrite_input_shapes={'mel_spectrogram': [1, N_MELS, N_FRAMES]}
+    )
+    if not ok:
+        print("WARNING: Simplified model failed validation, keeping original")
+        return model_bytes
+    return model_simp.SerializeToString()
+
+
+def convert_onnx_to_fp16(model_bytes: bytes) -> bytes:
+    """
+    Convert a serialized ONNX model's weights and activations to FP16.
+
+    Inputs and outputs stay FP32 (keep_io_types) so mel spectrograms are
+    fed exactly as before.
+    """
+    try:
+        import onnx
+        from onnxconverter_common import float16
+    except ImportError:
+        print("WARNING: onnxconverter-common not installed, exporting FP32")
+        print("  Run: pip install onnxconverter-common")
+        return model_bytes
+
+    print("Converting ONNX graph to FP16...")
+    model = float16.convert_float_to_float16(
+        onnx.load_from_string(model_bytes), keep_io_types=True
+    )
+    return model.SerializeToString()
+
+
+def _list_calibration_audio(dataset_dir: str, num_samples: int) -> list:
+    """Up to num_samples .wav/.flac/.mp3 files under dataset_dir."""
+    if not dataset_dir:
+        return []
+    return sorted(
+        p for p in Path(dataset_dir).rglob('*')
+        if p.suffix.lower() in ('.wav', '.flac', '.mp3')
+    )[:num_samples]
+
+
+def compute_mel_stats(dataset_dir: str = None, num_samples: int = 50):
+    """
+    Mean and std of Whisper log-mels over the calibration clips.
+
+    Returns (0.0, 1.0), i.e. no input normalization, if there are no clips.
+    """
+    audio_files = _list_calibration_audio(dataset_dir, num_samples)
+    if not audio_files:
+        return 0.0, 1.0
+
+    try:
+        import whisper
+    except ImportError:
+        print("ERROR: openai-whisper not installed. Run: pip install openai-whisper")
+        sys.exit(1)
+
+    total = total_sq = 0.0
+    for audio_file in audio_files:
+        audio = whisper.pad_or_trim(whisper.load_audio(str(audio_file)))
+        mel = whisper.log_mel_spectrogram(audio).numpy().astype(np.float64)
+        total += mel.sum()
+        total_sq += np.square(mel).sum()
+
+    count = len(audio_files) * N_MELS * N_FRAMES
+    mean = total / count
+    std = max(float(np.sqrt(total_sq / count - mean * mean)), 1e-6)
+    print(f"Log-mel stats over {len(audio_files)} clips: mean={mean:.4f}, std={std:.4f}")
+    return float(mean), std
+
+
+def mel_stats_path(onnx_path: Path) -> Path:
+    """JSON sidecar recording the input normalization baked into onnx_path."""
+    return onnx_path.with_suffix('.mel_stats.json')
+
+
+def load_mel_stats(onnx_path: Path):
+    """Normalization an exported encoder expects; identity for older exports."""
+    try:
+        stats = json.loads(mel_stats_path(onnx_path).read_text())
+    except FileNotFoundError:
+        return 0.0, 1.0
+    return stats['mean'], stats['std']
+
+
+@functools.lru_cache(maxsize=3)
+def _load_encoder(model_size: str):
+    """
+    Load a Whisper model and keep only its encoder, in eval mode.
+
+    Cached so repeated exports in one process (e.g. sweeping quantization
+    settings from Python) skip re-reading the checkpoint. The decoder is
+    dropped straight away so its weights do not stay resident.
+    """
     try:
         import whisper
     except ImportError:
@@ -39,55 +175,164 @@ def export_whisper_encoder_to_onnx(
 
     print(f"Loading Whisper {model_size} model...")
     model = whisper.load_model(model_size)
-    encoder = model.encoder
-    encoder.eval()
+    encoder = model.encoder.eval()
+    del model.decoder
+    return encoder
 
-    # Create output directory
-    os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, f'whisper_{model_size}_encoder.onnx')
+
+def export_whisper_encoder_to_onnx(
+    model_size: str = 'tiny',
+    output_dir: Path = Path('models/whisper_onnx'),
+    dynamic: bool = False,
+    mel_mean: float = 0.0,
+    mel_std: float = 1.0,
+    fp16: bool = False,
+):
+    """
+    Export Whisper encoder to ONNX format.
+
+    Shapes are fixed to (1, 80, 3000) unless dynamic is set: dynamic axes
+    leave Shape/Reshape subgraphs that RKNN runs on the CPU. With mel_mean
+    and mel_std set, the exported graph expects normalized input (see
+    NormalizedInputEncoder) and the stats are saved in a JSON sidecar.
+
+    With fp16 set (FP16 RKNN builds), the graph is stored in half
+    precision, halving the file RKNN has to load and convert. output_dir
+    must already exist.
+    """
+    encoder = _load_encoder(model_size)
+    if (mel_mean, mel_std) != (0.0, 1.0):
+        encoder = NormalizedInputEncoder(encoder, mel_mean, mel_std).eval()
+
+    output_path = output_dir / f'whisper_{model_size}_encoder.onnx'
 
     # Whisper encoder input: mel spectrogram
     # Shape: (batch_size, n_mels, n_frames)
     # n_mels = 80 (for all Whisper models)
     # n_frames = 3000 (30 seconds at 16kHz with 10ms hop)
     batch_size = 1
-    n_mels = 80
-    n_frames = 3000
 
-    dummy_input = torch.randn(batch_size, n_mels, n_frames)
+    dummy_input = torch.randn(batch_size, N_MELS, N_FRAMES)
 
     print(f"\nExporting Whisper encoder to ONNX...")
     print(f"  Model: {model_size}")
     print(f"  Input shape: {dummy_input.shape}")
     print(f"  Output: {output_path}")
 
-    torch.onnx.export(
-        encoder,
-        dummy_input,
-        output_path,
-        input_names=['mel_spectrogram'],
-        output_names=['encoder_output'],
-        dynamic_axes={
+    dynamic_axes = None
+    if dynamic:
+        dynamic_axes = {
             'mel_spectrogram': {0: 'batch_size', 2: 'n_frames'},
             'encoder_output': {0: 'batch_size', 1: 'n_frames'}
-        },
-        opset_version=12,  # RKNN compatible
-        do_constant_folding=True,
-    )
+        }
+
+    # Export and simplify in memory so the graph hits disk once, already
+    # in its final form, right before RKNN reads it back
+    buffer = io.BytesIO()
+    with torch.no_grad():
+        torch.onnx.export(
+            encoder,
+            dummy_input,
+            buffer,
+            input_names=['mel_spectrogram'],
+            output_names=['encoder_output'],
+            dynamic_axes=dynamic_axes,
+            opset_version=13,  # RKNN supports opset 11-13
+            do_constant_folding=True,
+        )
+    model_bytes = buffer.getvalue()
+    del buffer
+
+    if not dynamic:
+        model_bytes = simplify_onnx(model_bytes)
+    if fp16:
+        model_bytes = convert_onnx_to_fp16(model_bytes)
+
+    output_path.write_bytes(model_bytes)
+    mel_stats_path(output_path).write_text(json.dumps({'mean': mel_mean, 'std': mel_std}))
 
     print(f"✓ ONNX encoder saved: {output_path}")
-    print(f"  Model size: {os.path.getsize(output_path) / 1024 / 1024:.2f} MB")
+    print(f"  Model size: {len(model_bytes) / 1024 / 1024:.2f} MB")
 
     return output_path
 
 
+def build_whisper_calibration(
+    work_dir: str,
+    dataset_dir: str = None,
+    num_samples: int = 50,
+    mel_mean: float = 0.0,
+    mel_std: float = 1.0,
+):
+    """
+    Build INT8 calibration mel spectrograms from real audio clips.
+
+    Each clip is padded/trimmed to 30 seconds and converted with
+    whisper.log_mel_spectrogram, matching what the encoder sees at
+    inference time. Falls back to random noise if no clips are found.
+    Samples are written to work_dir as they are computed, so memory use
+    does not grow with num_samples.
+
+    Returns:
+        (dataset_path, is_real) - path of a dataset.txt listing the
+        (1, 80, 3000) float32 .npy samples, and whether they came from
+        real audio
+    """
+    work_dir = Path(work_dir)
+    sample_paths = []
+    audio_files = _list_calibration_audio(dataset_dir, num_samples)
+
+    if not audio_files:
+        print("WARNING: No calibration audio found, using random noise")
+        print("  INT8 accuracy will suffer; pass --calibration-audio DIR")
+        for i in range(num_samples):
+            sample_path = work_dir / f'{i:04d}.npy'
+            noise = mel_mean + mel_std * np.random.randn(1, N_MELS, N_FRAMES)
+            np.save(sample_path, noise.astype(np.float32))
+            sample_paths.append(sample_path)
+        return _write_dataset_list(work_dir, sample_paths), False
+
+    try:
+        import whisper
+    except ImportError:
+        print("ERROR: openai-whisper not installed. Run: pip install openai-whisper")
+        sys.exit(1)
+
+    print(f"Computing mel spectrograms for {len(audio_files)} clips from {dataset_dir}")
+    for i, audio_file in enumerate(audio_files):
+        audio = whisper.pad_or_trim(whisper.load_audio(str(audio_file)))
+        mel = whisper.log_mel_spectrogram(audio).numpy().astype(np.float32)
+        sample_path = work_dir / f'{i:04d}.npy'
+        np.save(sample_path, mel[np.newaxis])
+        sample_paths.append(sample_path)
+
+    return _write_dataset_list(work_dir, sample_paths), True
+
+
+def _write_dataset_list(work_dir: Path, sample_paths: list) -> str:
+    """Write the dataset.txt sample listing rknn.build(dataset=...) reads."""
+    dataset_path = work_dir / 'dataset.txt'
+    dataset_path.write_text(''.join(f'{p.resolve()}\n' for p in sample_paths))
+    return str(dataset_path)
+
+
 def convert_onnx_to_rknn(
-    onnx_path: str,
-    output_path: str,
+    onnx_path: Path,
+    output_path: Path,
     quantize: bool = True,
-    target_platform: str = 'rk3588'
+    target_platform: str = 'rk3588',
+    calibration_audio: str = None,
+    calibration_samples: int = 50,
+    mel_mean: float = 0.0,
+    mel_std: float = 1.0,
 ):
-    """Convert ONNX encoder to RKNN format."""
+    """
+    Convert ONNX encoder to RKNN format.
+
+    Calibration samples are raw log-mels; mel_mean/mel_std must match the
+    normalization baked into the ONNX export, and RKNN applies them the
+    same way at calibration and at runtime.
+    """
     try:
         from rknn.api import RKNN
     except ImportError:
@@ -103,21 +348,36 @@ def convert_onnx_to_rknn(
     print(f"Target: {target_platform}")
     print(f"Quantization: {'INT8' if quantize else 'FP16'}")
 
+    # Calibration samples are spilled to a temp dir and removed after build
+    calib_tmp = None
+    dataset, real_calibration = None, False
+    if quantize:
+        print("\nCreating calibration dataset for INT8 quantization...")
+        calib_tmp = tempfile.TemporaryDirectory(prefix='whisper_calib_')
+        dataset, real_calibration = build_whisper_calibration(
+            calib_tmp.name, calibration_audio, calibration_samples,
+            mel_mean, mel_std
+        )
+
     # Create RKNN object
     rknn = RKNN(verbose=True)
 
     # Configuration for Whisper encoder
+    # mmse is slower to build but gives tighter ranges, which only pays off
+    # when the calibration data is representative
     print("\nConfiguring...")
     rknn.config(
+        mean_values=[[mel_mean] * N_MELS],
+        std_values=[[mel_std] * N_MELS],
         target_platform=target_platform,
-        quantized_algorithm='normal',
+        quantized_algorithm='mmse' if real_calibration else 'normal',
         quantized_method='channel' if quantize else None,
         optimization_level=3,
     )
 
     # Load ONNX model
     print("\nLoading ONNX model...")
-    ret = rknn.load_onnx(model=onnx_path)
+    ret = rknn.load_onnx(model=str(onnx_path))
     if ret != 0:
         print('ERROR: Load ONNX model failed!')
         return False
@@ -126,13 +386,6 @@ def convert_onnx_to_rknn(
     print("\nBuilding RKNN model...")
 
     if quantize:
-        print("Creating calibration dataset for INT8 quantization...")
-        # Generate random mel spectrograms for calibration
-        dataset = []
-        for _ in range(50):  # Fewer samples for transformer models
-            mel = np.random.randn(1, 80, 3000).astype(np.float32)
-            dataset.append(mel)
-
         ret = rknn.build(
             do_quantization=True,
             dataset=dataset,
@@ -144,13 +397,16 @@ def convert_onnx_to_rknn(
             rknn_batch_size=1
         )
 
+    if calib_tmp is not None:
+        calib_tmp.cleanup()
+
     if ret != 0:
         print('ERROR: Build RKNN model failed!')
         return False
 
     # Export RKNN model
     print(f"\nExporting RKNN model to: {output_path}")
-    ret = rknn.export_rknn(output_path)
+    ret = rknn.export_rknn(str(output_path))
     if ret != 0:
         print('ERROR: Export RKNN model failed!')
         return False
@@ -162,7 +418,7 @@ def convert_onnx_to_rknn(
     print(f"✓ Conversion successful!")
     print(f"{'='*60}")
     print(f"RKNN model: {output_path}")
-    print(f"Model size: {os.path.getsize(output_path) / 1024 / 1024:.2f} MB")
+    print(f"Model size: {output_path.stat().st_size / 1024 / 1024:.2f} MB")
 
     return True
 
@@ -201,32 +457,71 @@ def main():
         action='store_true',
         help='Skip ONNX export (use existing .onnx file)'
     )
+    parser.add_argument(
+        '--dynamic',
+        action='store_true',
+        help='Export with dynamic batch/frame axes (slower on the NPU)'
+    )
+    parser.add_argument(
+        '--calibration-audio',
+        type=str,
+        default=None,
+        help='Directory of .wav/.flac/.mp3 clips for INT8 calibration'
+    )
+    parser.add_argument(
+        '--calibration-samples', '--calib-samples',
+        type=int,
+        default=50,
+        help='Number of calibration clips to use (fewer for transformer models)'
+    )
 
     args = parser.parse_args()
 
     # Create output directory
-    os.makedirs(args.output_dir, exist_ok=True)
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
 
     # Step 1: Export to ONNX
-    onnx_dir = 'models/whisper_onnx'
-    onnx_path = os.path.join(onnx_dir, f'whisper_{args.model}_encoder.onnx')
+    onnx_dir = Path('models/whisper_onnx')
+    onnx_path = onnx_dir / f'whisper_{args.model}_encoder.onnx'
 
     if args.skip_onnx:
-        if not os.path.exists(onnx_path):
+        if not onnx_path.is_file():
             print(f"ERROR: ONNX file not found: {onnx_path}")
             sys.exit(1)
         print(f"Using existing ONNX file: {onnx_path}")
+        mel_mean, mel_std = load_mel_stats(onnx_path)
     else:
-        onnx_path = export_whisper_encoder_to_onnx(args.model, onnx_dir)
+        # Normalize the INT8 input with stats from the calibration corpus
+        mel_mean, mel_std = 0.0, 1.0
+        if not args.no_quantize:
+            mel_mean, mel_std = compute_mel_stats(
+                args.calibration_audio, args.calibration_samples
+            )
+        onnx_dir.mkdir(parents=True, exist_ok=True)
+        onnx_path = export_whisper_encoder_to_onnx(
+            args.model, onnx_dir, args.dynamic, mel_mean, mel_std,
+            fp16=args.no_quantize
+        )
+        # The export's locals are gone; drop the cached encoder too so
+        # PyTorch weights are not resident during the RKNN build
+        _load_encoder.cache_clear()
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
 
     # Step 2: Convert ONNX to RKNN
-    output_path = os.path.join(args.output_dir, f'whisper_{args.model}_encoder.rknn')
+    output_path = output_dir / f'whisper_{args.model}_encoder.rknn'
 
     success = convert_onnx_to_rknn(
         onnx_path=onnx_path,
         output_path=output_path,
         quantize=not args.no_quantize,
-        target_platform=args.target
+        target_platform=args.target,
+        calibration_audio=args.calibration_audio,
+        calibration_samples=args.calibration_samples,
+        mel_mean=mel_mean,
+        mel_std=mel_std,
     )
 
     if not success:
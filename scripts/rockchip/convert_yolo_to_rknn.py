@@ -3,22 +3,50 @@
 Convert YOLOv8 model to RKNN format for Rockchip NPU (RK3588).
 
 Usage:
-    python convert_yolo_to_rknn.py --model yolov8n.pt --imgsz 640
+    python convert_yolo_to_rknn.py --model yolov8n.pt --imgsz 640 --calib-dir calib_images
 
 Requirements:
-    pip install rknn-toolkit2 ultralytics onnx
+    pip install rknn-toolkit2 ultralytics onnx opencv-python
 """
 
 import argparse
-import os
+import json
 import sys
+import tempfile
 from pathlib import Path
 
 import numpy as np
 
+# --calib-auto: stop growing the calibration set once the INT8 output is
+# this close (cosine similarity) to the FP32 ONNX output
+CALIB_AUTO_TARGET_COSINE = 0.995
 
-def export_yolo_to_onnx(model_path: str, imgsz: int = 640):
-    """Export YOLOv8 PyTorch model to ONNX format."""
+
+def replace_silu_with_relu(module) -> int:
+    """
+    Swap every nn.SiLU in module for nn.ReLU, in place.
+    
+    ReLU fuses into the preceding Conv on the RK3588 NPU and quantizes
+    cleanly to INT8; SiLU does neither. Returns the number replaced.
+    """
+    import torch.nn as nn
+    
+    replaced = 0
+    for parent in module.modules():
+        for name, child in parent.named_children():
+            if isinstance(child, nn.SiLU):
+                setattr(parent, name, nn.ReLU(inplace=True))
+                replaced += 1
+    return replaced
+
+
+def export_yolo_to_onnx(model_path: Path, imgsz: int = 640, relu: bool = False):
+    """
+    Export YOLOv8 PyTorch model to ONNX format.
+    
+    With relu set, SiLU activations are replaced with ReLU first. Only
+    use this on a model fine-tuned with ReLU; stock weights lose accuracy.
+    """
     try:
         from ultralytics import YOLO
     except ImportError:
@@ -26,9 +54,14 @@ def export_yolo_to_onnx(model_path: str, imgsz: int = 640):
         sys.exit(1)
 
     print(f"Loading YOLOv8 model: {model_path}")
-    model = YOLO(model_path)
+    model = YOLO(str(model_path))
+    
+    if relu:
+        replaced = replace_silu_with_relu(model.model)
+        print(f"  Replaced {replaced} SiLU activations with ReLU")
+        print("  (accuracy drops unless the model was fine-tuned with ReLU)")
 
-    onnx_path = model_path.replace('.pt', '.onnx')
+    onnx_path = model_path.with_suffix('.onnx')
     
     print(f"Exporting to ONNX: {onnx_path}")
     print(f"  Input size: {imgsz}x{imgsz}")
@@ -46,27 +79,137 @@ def export_yolo_to_onnx(model_path: str, imgsz: int = 640):
     return onnx_path
 
 
-def create_calibration_dataset(num_samples: int = 100, imgsz: int = 640):
-    """Create random calibration dataset for INT8 quantization."""
-    print(f"Creating calibration dataset: {num_samples} samples of {imgsz}x{imgsz}")
-    
-    # Generate random images (RGB, 0-255)
-    dataset = []
-    for i in range(num_samples):
-        img = np.random.randint(0, 256, (imgsz, imgsz, 3), dtype=np.uint8)
-        dataset.append(img)
+def list_calibration_images(calib_dir: str) -> list:
+    """Sorted .jpg/.png files in calib_dir."""
+    return sorted(
+        p for p in Path(calib_dir).glob('*')
+        if p.suffix.lower() in ('.jpg', '.jpeg', '.png')
+    )
+
+
+def load_calibration_image(image_file: Path, imgsz: int = 640):
+    """Read an image as imgsz x imgsz RGB uint8 (HWC), or None if unreadable."""
+    try:
+        import cv2
+    except ImportError:
+        print("ERROR: opencv-python not installed. Run: pip install opencv-python")
+        sys.exit(1)
     
-    return dataset
+    img = cv2.imread(str(image_file))
+    if img is None:
+        return None
+    img = cv2.resize(img, (imgsz, imgsz))
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+
+def create_calibration_dataset(
+    calib_dir: str,
+    work_dir: str,
+    num_samples: int = 100,
+    imgsz: int = 640,
+    synthetic: bool = False
+):
+    """
+    Create the calibration dataset for INT8 quantization.
+    
+    Real images from calib_dir are resized to imgsz x imgsz RGB and saved
+    as .npy samples in work_dir, listed one per line in a dataset.txt,
+    which is the form rknn.build(dataset=...) expects. Samples are
+    written one at a time, so memory use does not grow with num_samples.
+    If calib_dir has no images, random samples are used with a warning.
+    
+    Returns:
+        Path to dataset.txt
+    """
+    work_dir = Path(work_dir)
+    work_dir.mkdir(parents=True, exist_ok=True)
+    sample_paths = []
+    
+    image_files = [] if synthetic else list_calibration_images(calib_dir)[:num_samples]
+    if not synthetic and not image_files:
+        print("\n" + "!" * 60)
+        print(f"WARNING: No .jpg/.png calibration images in {calib_dir}")
+        print("  Falling back to RANDOM calibration data - INT8 accuracy")
+        print("  will be poor. Add representative images to --calib-dir")
+        print("  and re-run before deploying this model.")
+        print("!" * 60 + "\n")
+        synthetic = True
+    
+    if synthetic:
+        print(f"WARNING: Using {num_samples} random images for calibration")
+        print("  INT8 accuracy will suffer; pass --calib-dir with real images")
+        for i in range(num_samples):
+            img = np.random.randint(0, 256, (imgsz, imgsz, 3), dtype=np.uint8)
+            sample_path = work_dir / f'{i:04d}.npy'
+            np.save(sample_path, img)
+            sample_paths.append(sample_path)
+    else:
+        print(f"Creating calibration dataset: {len(image_files)} images from {calib_dir}")
+        for i, image_file in enumerate(image_files):
+            img = load_calibration_image(image_file, imgsz)
+            if img is None:
+                print(f"  Skipping unreadable image: {image_file}")
+                continue
+            sample_path = work_dir / f'{i:04d}.npy'
+            np.save(sample_path, img)
+            sample_paths.append(sample_path)
+    
+    dataset_path = work_dir / 'dataset.txt'
+    dataset_path.write_text(''.join(f'{p.resolve()}\n' for p in sample_paths))
+    return str(dataset_path)
+
+
+def output_cosine_similarity(rknn, onnx_path: Path, image) -> float:
+    """
+    Cosine similarity of the built model's first output to the FP32 ONNX
+    output for one RGB uint8 image, run on the RKNN simulator.
+    """
+    import onnxruntime as ort
+    
+    session = ort.InferenceSession(str(onnx_path), providers=['CPUExecutionProvider'])
+    onnx_input = image.transpose(2, 0, 1)[np.newaxis].astype(np.float32) / 255.0
+    reference = session.run(None, {session.get_inputs()[0].name: onnx_input})[0].ravel()
+    
+    if rknn.init_runtime() != 0:
+        raise RuntimeError('RKNN simulator runtime init failed')
+    output = rknn.inference(inputs=[image])[0].ravel().astype(np.float32)
+    
+    denom = np.linalg.norm(reference) * np.linalg.norm(output)
+    return float(reference @ output / denom) if denom else 0.0
+
+
+def calib_sample_schedule(start: int, available: int) -> list:
+    """Calibration set sizes to try: start, doubling up to available."""
+    counts = [max(1, min(start, available))]
+    while counts[-1] < available:
+        counts.append(min(counts[-1] * 2, available))
+    return counts
 
 
 def convert_onnx_to_rknn(
-    onnx_path: str,
-    output_path: str,
+    onnx_path: Path,
+    output_path: Path,
     imgsz: int = 640,
     quantize: bool = True,
-    target_platform: str = 'rk3588'
+    target_platform: str = 'rk3588',
+    calib_dir: str = 'calib_images',
+    calib_samples: int = 100,
+    calib_synthetic: bool = False,
+    calib_auto: bool = False,
+    keep_open: bool = False
 ):
-    """Convert ONNX model to RKNN format."""
+    """
+    Convert ONNX model to RKNN format.
+    
+    With calib_auto, the INT8 build is repeated with calib_samples,
+    doubling up to every image in calib_dir, until its output reaches
+    CALIB_AUTO_TARGET_COSINE similarity to FP32 on a held-out image. The
+    attempts are recorded in <output>.calib_report.json.
+    
+    Returns:
+        (success, rknn) - rknn is the live handle when keep_open is set
+        (caller releases it), otherwise None
+    """
     try:
         from rknn.api import RKNN
     except ImportError:
@@ -83,97 +226,153 @@ def convert_onnx_to_rknn(
     print(f"Target: {target_platform}")
     print(f"Quantization: {'INT8' if quantize else 'FP16'}")
     
-    # Create RKNN object
-    rknn = RKNN(verbose=True)
-    
-    # Pre-processing configuration for YOLOv8
-    # YOLOv8 expects normalized input [0, 1]
-    print("\nConfiguring pre-processing...")
-    rknn.config(
-        mean_values=[[0, 0, 0]],  # No mean subtraction
-        std_values=[[255, 255, 255]],  # Normalize to [0, 1]
-        target_platform=target_platform,
-        quantized_algorithm='normal',  # 'normal' or 'mmse'
-        quantized_method='channel' if quantize else None,
-        optimization_level=3,  # 0-3, higher is more optimized
-    )
-    
-    # Load ONNX model
-    print("\nLoading ONNX model...")
-    ret = rknn.load_onnx(model=onnx_path)
-    if ret != 0:
-        print('ERROR: Load ONNX model failed!')
-        return False
-    
-    # Build RKNN model
-    print("\nBuilding RKNN model...")
-    
-    if quantize:
-        # Create calibration dataset for INT8 quantization
-        print("Creating calibration dataset for INT8 quantization...")
-        dataset = create_calibration_dataset(num_samples=100, imgsz=imgsz)
+    sample_counts = [calib_samples]
+    eval_image = None
+    if quantize and calib_auto:
+        if calib_synthetic:
+            print("WARNING: --calib-auto needs real images, ignoring it")
+        else:
+            # Hold the last image out of calibration to measure accuracy on
+            image_files = list_calibration_images(calib_dir)
+            if len(image_files) < 2:
+                print(f"ERROR: --calib-auto needs at least 2 images in {calib_dir}")
+                sys.exit(1)
+            eval_image = load_calibration_image(image_files[-1], imgsz)
+            sample_counts = calib_sample_schedule(calib_samples, len(image_files) - 1)
+    
+    attempts = []
+    for num_samples in sample_counts:
+        # Create RKNN object
+        rknn = RKNN(verbose=True)
         
-        ret = rknn.build(
-            do_quantization=True,
-            dataset=dataset,
-            rknn_batch_size=1
-        )
-    else:
-        ret = rknn.build(
-            do_quantization=False,
-            rknn_batch_size=1
+        # Pre-processing configuration for YOLOv8
+        # YOLOv8 expects normalized input [0, 1]
+        print("\nConfiguring pre-processing...")
+        rknn.config(
+            mean_values=[[0, 0, 0]],  # No mean subtraction
+            std_values=[[255, 255, 255]],  # Normalize to [0, 1]
+            target_platform=target_platform,
+            quantized_algorithm='normal',  # 'normal' or 'mmse'
+            quantized_method='channel' if quantize else None,
+            optimization_level=3,  # 0-3, higher is more optimized
         )
+        
+        # Load ONNX model
+        print("\nLoading ONNX model...")
+        ret = rknn.load_onnx(model=str(onnx_path))
+        if ret != 0:
+            print('ERROR: Load ONNX model failed!')
+            rknn.release()
+            return False, None
+        
+        # Build RKNN model
+        print("\nBuilding RKNN model...")
+        
+        if quantize:
+            # Create calibration dataset for INT8 quantization; samples are
+            # spilled to a temp dir that is removed once the build has read them
+            print("Creating calibration dataset for INT8 quantization...")
+            with tempfile.TemporaryDirectory(prefix='yolo_calib_') as work_dir:
+                dataset = create_calibration_dataset(
+                    calib_dir=calib_dir,
+                    work_dir=work_dir,
+                    num_samples=num_samples,
+                    imgsz=imgsz,
+                    synthetic=calib_synthetic
+                )
+                
+                ret = rknn.build(
+                    do_quantization=True,
+                    dataset=dataset,
+                    rknn_batch_size=1
+                )
+        else:
+            ret = rknn.build(
+                do_quantization=False,
+                rknn_batch_size=1
+            )
+        
+        if ret != 0:
+            print('ERROR: Build RKNN model failed!')
+            rknn.release()
+            return False, None
+        
+        # Export RKNN model
+        print(f"\nExporting RKNN model to: {output_path}")
+        ret = rknn.export_rknn(str(output_path))
+        if ret != 0:
+            print('ERROR: Export RKNN model failed!')
+            rknn.release()
+            return False, None
+        
+        if eval_image is None:
+            break
+        
+        similarity = output_cosine_similarity(rknn, onnx_path, eval_image)
+        attempts.append({'samples': num_samples, 'cosine_similarity': similarity})
+        print(f"\nCalibration with {num_samples} samples: cosine similarity {similarity:.4f}")
+        if similarity >= CALIB_AUTO_TARGET_COSINE or num_samples == sample_counts[-1]:
+            break
+        rknn.release()
     
-    if ret != 0:
-        print('ERROR: Build RKNN model failed!')
-        return False
-    
-    # Export RKNN model
-    print(f"\nExporting RKNN model to: {output_path}")
-    ret = rknn.export_rknn(output_path)
-    if ret != 0:
-        print('ERROR: Export RKNN model failed!')
-        return False
+    if attempts:
+        report_path = output_path.with_suffix('.calib_report.json')
+        report_path.write_text(json.dumps({
+            'samples': attempts[-1]['samples'],
+            'target_cosine_similarity': CALIB_AUTO_TARGET_COSINE,
+            'attempts': attempts,
+        }, indent=2))
+        print(f"Calibration report: {report_path}")
     
     # Accuracy analysis (optional, takes time)
     print("\n[Optional] Run accuracy analysis? (y/n)")
     # Uncomment to enable interactive prompt
     # if input().lower() == 'y':
     #     print("\nRunning accuracy analysis...")
-    #     ret = rknn.accuracy_analysis(inputs=[dataset[0]], target=target_platform)
+    #     sample = next(Path(calib_dir).glob('*.jpg'))
+    #     ret = rknn.accuracy_analysis(inputs=[str(sample)], target=target_platform)
     
-    # Release RKNN instance
-    rknn.release()
+    # Release RKNN instance unless the caller reuses it (e.g. for testing)
+    if not keep_open:
+        rknn.release()
+        rknn = None
     
     print(f"\n{'='*60}")
     print(f"✓ Conversion successful!")
     print(f"{'='*60}")
     print(f"RKNN model: {output_path}")
-    print(f"Model size: {os.path.getsize(output_path) / 1024 / 1024:.2f} MB")
+    print(f"Model size: {output_path.stat().st_size / 1024 / 1024:.2f} MB")
     
-    return True
+    return True, rknn
 
 
-def test_rknn_model(rknn_path: str, imgsz: int = 640):
-    """Test RKNN model inference (requires RK3588 device or simulator)."""
-    try:
-        from rknn.api import RKNN
-    except ImportError:
-        print("RKNN toolkit not available for testing")
-        return
+def test_rknn_model(rknn_path: Path, imgsz: int = 640, rknn=None):
+    """
+    Test RKNN model inference (requires RK3588 device or simulator).
     
+    Pass the live handle from convert_onnx_to_rknn as rknn to skip
+    reloading the exported file. The handle is released either way.
+    """
     print(f"\n{'='*60}")
     print(f"Testing RKNN model: {rknn_path}")
     print(f"{'='*60}")
     
-    rknn = RKNN()
-    
-    # Load RKNN model
-    print("Loading RKNN model...")
-    ret = rknn.load_rknn(rknn_path)
-    if ret != 0:
-        print('ERROR: Load RKNN model failed!')
-        return
+    if rknn is None:
+        try:
+            from rknn.api import RKNN
+        except ImportError:
+            print("RKNN toolkit not available for testing")
+            return
+        
+        rknn = RKNN()
+        
+        # Load RKNN model
+        print("Loading RKNN model...")
+        ret = rknn.load_rknn(str(rknn_path))
+        if ret != 0:
+            print('ERROR: Load RKNN model failed!')
+            rknn.release()
+            return
     
     # Initialize runtime
     # Use 'rk3588' for actual device, 'None' for simulator
@@ -248,37 +447,72 @@ def main():
         action='store_true',
         help='Skip ONNX export (use existing .onnx file)'
     )
+    parser.add_argument(
+        '--relu',
+        action='store_true',
+        help='Swap SiLU for NPU-friendly ReLU before export (needs a ReLU fine-tuned model)'
+    )
+    parser.add_argument(
+        '--calib-dir',
+        type=str,
+        default='./calib_images',
+        help='Directory of representative .jpg/.png images for INT8 calibration '
+             '(random data is used, with a warning, if it has none)'
+    )
+    parser.add_argument(
+        '--calib-samples',
+        type=int,
+        default=100,
+        help='Number of calibration images to use'
+    )
+    parser.add_argument(
+        '--calib-synthetic',
+        action='store_true',
+        help='Calibrate on random images instead (poor INT8 accuracy)'
+    )
+    parser.add_argument(
+        '--calib-auto',
+        action='store_true',
+        help='Grow the calibration set from --calib-samples until INT8 output '
+             f'matches FP32 (cosine >= {CALIB_AUTO_TARGET_COSINE})'
+    )
     
     args = parser.parse_args()
     
     # Validate input
-    if not os.path.exists(args.model):
-        print(f"ERROR: Model file not found: {args.model}")
+    model_path = Path(args.model)
+    if not model_path.is_file():
+        print(f"ERROR: Model file not found: {model_path}")
         sys.exit(1)
     
     # Step 1: Export to ONNX
     if args.skip_onnx:
-        onnx_path = args.model.replace('.pt', '.onnx')
-        if not os.path.exists(onnx_path):
+        onnx_path = model_path.with_suffix('.onnx')
+        if not onnx_path.is_file():
             print(f"ERROR: ONNX file not found: {onnx_path}")
             sys.exit(1)
         print(f"Using existing ONNX file: {onnx_path}")
     else:
-        onnx_path = export_yolo_to_onnx(args.model, args.imgsz)
+        onnx_path = export_yolo_to_onnx(model_path, args.imgsz, args.relu)
     
     # Determine output path
     if args.output:
-        output_path = args.output
+        output_path = Path(args.output)
     else:
-        output_path = args.model.replace('.pt', '.rknn')
+        output_path = model_path.with_suffix('.rknn')
     
     # Step 2: Convert ONNX to RKNN
-    success = convert_onnx_to_rknn(
+    success, rknn = convert_onnx_to_rknn(
         onnx_path=onnx_path,
         output_path=output_path,
         imgsz=args.imgsz,
         quantize=not args.no_quantize,
-        target_platform=args.target
+        target_platform=args.target,
+        calib_dir=args.calib_dir,
+        calib_samples=args.calib_samples,
+        calib_synthetic=args.calib_synthetic,
+        calib_auto=args.calib_auto,
+        keep_open=args.test
     )
     
     if not success:
@@ -286,7 +520,7 @@ def main():
     
     # Step 3: Test (optional)
     if args.test:
-        test_rknn_model(output_path, args.imgsz)
+        test_rknn_model(output_path, args.imgsz, rknn=rknn)
     
     print("\n" + "="*60)
     print("Next steps:")
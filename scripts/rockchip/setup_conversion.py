@@ -7,12 +7,48 @@ The converted models can then be deployed to Orange Pi 5 Plus.
 
 Usage:
     ./setup_rockchip_conversion.sh
+    python scripts/rockchip/setup_conversion.py --force-reinstall
 """
 
+import argparse
+import importlib.util
 import os
 import platform
 import subprocess
 import sys
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Ultralytics release assets; fetched directly instead of via YOLO(), which
+# imports the whole package just to download a file
+YOLO_ASSETS_URL = 'https://github.com/ultralytics/assets/releases/download/v8.3.0'
+
+# Module each pip distribution provides, for cheap presence checks
+IMPORT_NAMES = {
+    'rknn-toolkit2': 'rknn.api',
+    'ultralytics': 'ultralytics',
+    'onnx': 'onnx',
+    'onnxruntime': 'onnxruntime',
+    'onnxsim': 'onnxsim',
+    'onnxconverter-common': 'onnxconverter_common',
+    'opencv-python': 'cv2',
+    'openai-whisper': 'whisper',
+    'torch': 'torch',
+    'torchaudio': 'torchaudio',
+}
+
+
+def is_importable(module: str) -> bool:
+    """
+    Whether module can be imported, without importing it.
+
+    find_spec only locates the module; it does not run torch/onnx
+    import-time setup (native libs, CUDA probes) just to check presence.
+    """
+    try:
+        return importlib.util.find_spec(module) is not None
+    except ModuleNotFoundError:  # parent package (e.g. rknn) missing
+        return False
 
 
 def check_platform():
@@ -34,32 +70,69 @@ def check_platform():
     return True
 
 
-def install_dependencies():
-    """Install required Python packages."""
+def install_dependencies(force_reinstall: bool = False):
+    """
+    Install required Python packages.
+    
+    Packages that are already importable are skipped (so repeat runs never
+    touch pip) unless force_reinstall is set.
+    """
+    # Pinned to versions RKNN-Toolkit2 is validated against, all of which
+    # ship wheels for Python 3.8-3.11
     packages = [
-        'rknn-toolkit2',  # Rockchip conversion toolkit
-        'ultralytics',     # YOLOv8
-        'onnx',           # ONNX format
-        'onnxruntime',    # ONNX runtime
-        'opencv-python',  # Image processing
-        'openai-whisper', # Whisper (optional)
-        'torch',          # PyTorch
-        'torchaudio',     # Audio processing
+        'rknn-toolkit2==2.3.0',      # Rockchip conversion toolkit
+        'ultralytics==8.3.123',      # YOLOv8
+        'onnx==1.15.0',              # ONNX format
+        'onnxruntime==1.17.0',       # ONNX runtime
+        'onnxsim==0.4.36',           # ONNX graph simplifier
+        'onnxconverter-common==1.14.0',  # FP16 ONNX conversion
+        'opencv-python==4.9.0.80',   # Image processing
+        'openai-whisper==20231117',  # Whisper (optional)
+        'torch==2.1.2',              # PyTorch
+        'torchaudio==2.1.2',         # Audio processing
+    ]
+    
+    # Wheels only: a missing wheel fails fast instead of compiling torch
+    # from source. openai-whisper is pure Python and only ships an sdist.
+    pip_install = [
+        sys.executable, '-m', 'pip', 'install',
+        '--only-binary=:all:', '--no-binary=openai-whisper',
+        '--no-input', '-q',
     ]
     
+    if force_reinstall:
+        pip_install.append('--force-reinstall')
+    else:
+        packages = [
+            p for p in packages
+            if not is_importable(IMPORT_NAMES[p.split('==')[0]])
+        ]
+        if not packages:
+            print("\n✓ All dependencies already installed")
+            return
+    
     print("\nInstalling dependencies...")
     print("=" * 60)
     
+    # One pip invocation resolves and downloads everything in a single pass
+    try:
+        subprocess.check_call(pip_install + packages)
+        print(f"✓ {len(packages)} packages installed")
+        return
+    except subprocess.CalledProcessError:
+        print("✗ Batched install failed, retrying packages one by one...")
+    
+    # Per-package retry only to report which package is at fault
     for package in packages:
         print(f"\nInstalling {package}...")
         try:
-            subprocess.check_call([
-                sys.executable, '-m', 'pip', 'install', package
-            ])
+            subprocess.check_call(pip_install + [package])
             print(f"✓ {package} installed")
         except subprocess.CalledProcessError as e:
             print(f"✗ Failed to install {package}")
-            if package == 'rknn-toolkit2':
+            print(f"  No compatible wheel for Python {platform.python_version()}?")
+            print("  Use Python 3.8-3.11 rather than building from source")
+            if package.startswith('rknn-toolkit2'):
                 print("\nRKNN-Toolkit2 installation failed.")
                 print("Try manual installation:")
                 print("1. Clone: git clone https://github.com/rockchip-linux/rknn-toolkit2")
@@ -73,19 +146,13 @@ def verify_installation():
     print("Verifying installation...")
     print("=" * 60)
     
-    checks = {
-        'rknn-toolkit2': 'from rknn.api import RKNN',
-        'ultralytics': 'from ultralytics import YOLO',
-        'onnx': 'import onnx',
-        'torch': 'import torch',
-    }
+    checks = ['rknn-toolkit2', 'ultralytics', 'onnx', 'torch']
     
     all_ok = True
-    for name, import_stmt in checks.items():
-        try:
-            exec(import_stmt)
+    for name in checks:
+        if is_importable(IMPORT_NAMES[name]):
             print(f"✓ {name}: OK")
-        except ImportError:
+        else:
             print(f"✗ {name}: NOT FOUND")
             all_ok = False
     
@@ -102,17 +169,31 @@ def download_models():
         print("Skipping model download")
         return
     
-    # Download YOLOv8n if not present
+    # Download YOLOv8 weights if not present
     yolo_models = ['yolov8n.pt', 'yolov8s.pt']
     
+    missing = []
     for model in yolo_models:
         if os.path.exists(model):
             print(f"✓ {model} already exists")
         else:
-            print(f"Downloading {model}...")
+            missing.append(model)
+    if not missing:
+        return
+    
+    def download(model):
+        # Download to a temp name so an interrupted fetch leaves no bad .pt
+        tmp_path = model + '.part'
+        urllib.request.urlretrieve(f'{YOLO_ASSETS_URL}/{model}', tmp_path)
+        os.replace(tmp_path, model)
+    
+    print(f"Downloading {', '.join(missing)}...")
+    with ThreadPoolExecutor(max_workers=len(missing)) as pool:
+        futures = {pool.submit(download, model): model for model in missing}
+        for future in as_completed(futures):
+            model = futures[future]
             try:
-                from ultralytics import YOLO
-                YOLO(model)  # Auto-downloads
+                future.result()
                 print(f"✓ {model} downloaded")
             except Exception as e:
                 print(f"✗ Failed to download {model}: {e}")
@@ -145,6 +226,16 @@ echo "Copy yolov8n.rknn to your Orange Pi 5 Plus"
 
 
 def main():
+    parser = argparse.ArgumentParser(
+        description='Install dependencies for Rockchip model conversion'
+    )
+    parser.add_argument(
+        '--force-reinstall',
+        action='store_true',
+        help='Reinstall every package even if it is already importable'
+    )
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("Rockchip Model Conversion Setup")
     print("=" * 60)
@@ -157,7 +248,7 @@ def main():
             sys.exit(1)
     
     # Install dependencies
-    install_dependencies()
+    install_dependencies(force_reinstall=args.force_reinstall)
     
     # Verify installation
     if not verify_installation():
@@ -177,7 +268,8 @@ def main():
     print("Setup complete!")
     print("=" * 60)
     print("\nNext steps:")
-    print("1. Convert YOLO model:")
+    print("1. Convert YOLO model (put representative .jpg/.png images in")
+    print("   ./calib_images first for accurate INT8 calibration):")
     print("   python scripts/rockchip/convert_yolo_to_rknn.py --model yolov8n.pt")
     print("\n2. Or use quick script:")
     print("   ./convert_yolo_quick.sh")
@@ -22,8 +22,10 @@ Then add to your .env or environment:
     ATLAS_TOOLS_CALENDAR_REFRESH_TOKEN=<output_from_this_script>
 """
 
-import http.server
+import html
 import json
+import re
+import socket
 import urllib.parse
 import webbrowser
 from urllib.request import Request, urlopen
@@ -67,46 +69,61 @@ def exchange_code_for_tokens(code: str, client_id: str, client_secret: str) -> d
         return json.loads(response.read().decode("utf-8"))
 
 
-class OAuthCallbackHandler(http.server.BaseHTTPRequestHandler):
-    """HTTP handler to capture OAuth callback."""
-
-    auth_code = None
-
-    def do_GET(self):
-        """Handle the OAuth callback."""
-        parsed = urllib.parse.urlparse(self.path)
-        params = urllib.parse.parse_qs(parsed.query)
-
-        if "code" in params:
-            OAuthCallbackHandler.auth_code = params["code"][0]
-            self.send_response(200)
-            self.send_header("Content-Type", "text/html")
-            self.end_headers()
-            self.wfile.write(b"""
+SUCCESS_HTML = b"""
                 <html>
                 <body style="font-family: sans-serif; text-align: center; padding: 50px;">
                     <h1>Authorization Successful!</h1>
                     <p>You can close this window and return to the terminal.</p>
                 </body>
                 </html>
-            """)
-        else:
-            error = params.get("error", ["Unknown error"])[0]
-            self.send_response(400)
-            self.send_header("Content-Type", "text/html")
-            self.end_headers()
-            self.wfile.write(f"""
+            """
+
+FAILURE_HTML = """
                 <html>
                 <body style="font-family: sans-serif; text-align: center; padding: 50px;">
                     <h1>Authorization Failed</h1>
                     <p>Error: {error}</p>
                 </body>
                 </html>
-            """.encode())
-
-    def log_message(self, format, *args):
-        """Suppress HTTP logging."""
-        pass
+            """
+
+
+def wait_for_auth_code(port: int = 8085) -> str | None:
+    """
+    Accept the OAuth redirect on localhost:port and return its code.
+
+    A bare socket is enough for this one-shot GET. Connections that carry
+    no OAuth query (browser preconnects, favicon requests) are skipped.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server:
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(("localhost", port))
+        server.listen(1)
+
+        while True:
+            conn, _ = server.accept()
+            with conn:
+                request = conn.recv(4096)
+                match = re.match(rb"GET /?\?(\S*) HTTP/", request)
+                params = urllib.parse.parse_qs(match.group(1).decode()) if match else {}
+
+                if "code" in params:
+                    body, status = SUCCESS_HTML, b"200 OK"
+                elif "error" in params:
+                    error = html.escape(params["error"][0])
+                    body, status = FAILURE_HTML.format(error=error).encode(), b"400 Bad Request"
+                else:
+                    if request:
+                        conn.sendall(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                    continue
+
+                conn.sendall(
+                    b"HTTP/1.1 " + status + b"\r\n"
+                    b"Content-Type: text/html\r\n"
+                    b"Content-Length: " + str(len(body)).encode() + b"\r\n"
+                    b"Connection: close\r\n\r\n" + body
+                )
+                return params["code"][0] if "code" in params else None
 
 
 def main():
@@ -143,10 +160,9 @@ def main():
 
     # Start local server to capture callback
     print("Waiting for authorization callback on localhost:8085...")
-    server = http.server.HTTPServer(("localhost", 8085), OAuthCallbackHandler)
-    server.handle_request()  # Handle single request
+    auth_code = wait_for_auth_code(8085)
 
-    if not OAuthCallbackHandler.auth_code:
+    if not auth_code:
         print("Error: No authorization code received")
         return
 
@@ -155,7 +171,7 @@ def main():
 
     try:
         tokens = exchange_code_for_tokens(
-            OAuthCallbackHandler.auth_code,
+            auth_code,
             client_id,
             client_secret,
         )
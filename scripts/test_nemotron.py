@@ -14,6 +14,7 @@ Press Ctrl+C to stop.
 import sys
 import time
 import queue
+import collections
 import threading
 import numpy as np
 import sounddevice as sd
@@ -67,20 +68,35 @@ class AudioBuffer:
 
     def __init__(self, chunk_samples):
         self.chunk_samples = chunk_samples
-        self.buffer = np.array([], dtype=np.float32)
+        # Pending audio as a deque of small blocks; only the blocks that make
+        # up one chunk are ever concatenated, never the whole backlog
+        self.blocks = collections.deque()
+        self.pending = 0
         self.lock = threading.Lock()
         self.chunk_queue = queue.Queue()
 
     def add_audio(self, audio_data):
         """Add audio data to buffer."""
+        # Copy: sounddevice reuses the callback's indata buffer
+        block = np.array(audio_data, dtype=np.float32).reshape(-1)
+
         with self.lock:
-            self.buffer = np.concatenate([self.buffer, audio_data.flatten()])
+            self.blocks.append(block)
+            self.pending += len(block)
 
             # Extract complete chunks
-            while len(self.buffer) >= self.chunk_samples:
-                chunk = self.buffer[:self.chunk_samples]
-                self.buffer = self.buffer[self.chunk_samples:]
-                self.chunk_queue.put(chunk)
+            while self.pending >= self.chunk_samples:
+                parts, taken = [], 0
+                while taken < self.chunk_samples:
+                    part = self.blocks.popleft()
+                    parts.append(part)
+                    taken += len(part)
+
+                joined = np.concatenate(parts) if len(parts) > 1 else parts[0]
+                if taken > self.chunk_samples:
+                    self.blocks.appendleft(joined[self.chunk_samples:])
+                self.pending -= self.chunk_samples
+                self.chunk_queue.put(joined[:self.chunk_samples])
 
     def get_chunk(self, timeout=0.1):
         """Get next chunk if available."""
@@ -0,0 +1,61 @@
+"""
+Tests for GaitRecognitionService embedding computation -- no MediaPipe.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# atlas_vision.recognition imports all its services on package import
+np = pytest.importorskip("numpy")
+pytest.importorskip("pydantic_settings")
+pytest.importorskip("cv2")
+pytest.importorskip("asyncpg")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "atlas_video-processing"))
+
+from atlas_vision.recognition.gait import (  # noqa: E402
+    POSE_LANDMARKS,
+    GaitRecognitionService,
+    pose_to_array,
+)
+
+
+def _random_poses(rng, count):
+    return [
+        {
+            name: {"x": float(x), "y": float(y)}
+            for name, (x, y) in zip(POSE_LANDMARKS, rng.random((13, 2)))
+        }
+        for _ in range(count)
+    ]
+
+
+def test_dense_buffer_matches_dict_features():
+    service = GaitRecognitionService(sequence_length=10)
+    poses = _random_poses(np.random.default_rng(0), 10)
+
+    expected = service._embed_frame_features(
+        np.array([service._extract_frame_features(pose) for pose in poses])
+    )
+    dense = service._embedding_from_buffer([pose_to_array(pose) for pose in poses])
+    mixed = service._embedding_from_buffer(poses)
+
+    assert dense.shape == (256,)
+    np.testing.assert_allclose(dense, expected, atol=1e-5)
+    np.testing.assert_allclose(mixed, expected, atol=1e-5)
+
+
+def test_track_embedding_from_arrays():
+    service = GaitRecognitionService(sequence_length=10)
+    poses = _random_poses(np.random.default_rng(1), 10)
+
+    for pose in poses[:-1]:
+        service.add_pose_to_track("cam", 1, pose_to_array(pose))
+    assert service.compute_track_gait_embedding("cam", 1) is None
+
+    service.add_pose_to_track("cam", 1, pose_to_array(poses[-1]))
+    embedding = service.compute_track_gait_embedding("cam", 1)
+    assert embedding is not None
+    assert np.linalg.norm(embedding) == pytest.approx(1.0, abs=1e-5)
@@ -0,0 +1,74 @@
+"""
+Tests for PersonRepository pgvector value parsing -- no DB.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# atlas_vision.recognition imports all its services on package import
+np = pytest.importorskip("numpy")
+pytest.importorskip("pydantic_settings")
+pytest.importorskip("cv2")
+pytest.importorskip("asyncpg")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "atlas_video-processing"))
+
+from atlas_vision.recognition.repository import PersonRepository  # noqa: E402
+
+
+@pytest.fixture
+def repo():
+    return PersonRepository.__new__(PersonRepository)
+
+
+def test_from_pgvector_parses_text(repo):
+    arr = repo._from_pgvector("[1,2.5,-3]", 3)
+    assert arr.dtype == np.float32
+    assert arr.tolist() == [1.0, 2.5, -3.0]
+
+
+@pytest.mark.parametrize("value", ["[1,2,3]", "[1,2,3,4,5,6]", [1.0, 2.0]])
+def test_from_pgvector_rejects_wrong_width(repo, value):
+    with pytest.raises(ValueError):
+        repo._from_pgvector(value, 5)
+
+
+def test_from_pgvector_unchecked_without_dim(repo):
+    assert repo._from_pgvector("[1,2]").tolist() == [1.0, 2.0]
+
+
+def _unit(v):
+    v = np.asarray(v, dtype=np.float32)
+    return v / np.linalg.norm(v)
+
+
+def test_match_cache_rescores_against_centroid():
+    repo = PersonRepository()
+    probe = _unit([1.0, 0.2, 0.1])
+    centroid = _unit([1.0, 0.6, 0.1])
+    for threshold in (0.5, 0.97):
+        key, cached = repo._match_cache_get("face", probe, threshold)
+        assert cached is None
+        repo._match_cache_put(key, probe, centroid, {"name": "a", "similarity": 0.99})
+
+    nearby = _unit([1.0, 0.25, 0.1])
+    _, cached = repo._match_cache_get("face", nearby, 0.5)
+    assert cached["name"] == "a"
+    assert cached["similarity"] == pytest.approx(float(np.dot(centroid, nearby)))
+
+    # Rescored similarity (~0.96) no longer clears the stricter threshold
+    _, cached = repo._match_cache_get("face", nearby, 0.97)
+    assert cached is None
+
+
+def test_match_cache_invalidate_by_kind():
+    repo = PersonRepository()
+    probe = _unit([1.0, 1.0])
+    key, _ = repo._match_cache_get("gait", probe, 0.5)
+    repo._match_cache_put(key, probe, probe, {"name": "a", "similarity": 1.0})
+    repo.invalidate_match_cache("face")
+    assert repo._match_cache_get("gait", probe, 0.5)[1] is not None
+    repo.invalidate_match_cache("gait")
+    assert repo._match_cache_get("gait", probe, 0.5)[1] is None
@@ -0,0 +1,65 @@
+"""
+Tests for the multi-person TrackManager.
+
+Round-trips tracks through create, lookup and stale cleanup -- all
+in-memory, no camera or DB.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# atlas_vision.recognition imports all its services on package import
+pytest.importorskip("numpy")
+pytest.importorskip("pydantic_settings")
+pytest.importorskip("cv2")
+pytest.importorskip("asyncpg")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "atlas_video-processing"))
+
+from atlas_vision.recognition.tracker import TrackManager  # noqa: E402
+
+CAMERA = "cam_test"
+
+
+def test_construct_uses_config_defaults():
+    manager = TrackManager()
+    assert 0 < manager._iou_threshold < 1
+    assert manager._track_timeout > 0
+
+
+def test_create_find_cleanup_round_trip():
+    manager = TrackManager()
+    manager.create_or_update_track(CAMERA, 1, [0, 0, 100, 200], now=100.0)
+    manager.create_or_update_track(CAMERA, 2, [300, 0, 400, 200], now=100.0)
+
+    track = manager.find_track_by_bbox_iou(CAMERA, [5, 5, 100, 200])
+    assert track is not None and track.track_id == 1
+
+    track = manager.find_track_containing_bbox(CAMERA, [320, 20, 360, 60])
+    assert track is not None and track.track_id == 2
+
+    assert manager.find_track_by_bbox_iou(CAMERA, [600, 600, 700, 700]) is None
+
+    # Track 1 refreshed, track 2 left to go stale
+    manager.create_or_update_track(CAMERA, 1, [10, 0, 110, 200], now=150.0)
+    removed = manager.cleanup_stale_tracks(max_age=30.0, now=160.0)
+
+    assert removed == 1
+    assert manager.get_track(CAMERA, 1) is not None
+    assert manager.get_track(CAMERA, 2) is None
+    assert manager.find_track_containing_bbox(CAMERA, [320, 20, 360, 60]) is None
+
+
+def test_cleanup_vectorized_path():
+    manager = TrackManager()
+    for track_id in range(40):
+        x = track_id * 50
+        now = 100.0 if track_id % 2 else 10.0
+        manager.create_or_update_track(CAMERA, track_id, [x, 0, x + 40, 80], now=now)
+
+    removed = manager.cleanup_stale_tracks(max_age=30.0, now=110.0)
+
+    assert removed == 20
+    assert sorted(t.track_id for t in manager.get_active_tracks(CAMERA)) == list(range(1, 40, 2))